@@ -0,0 +1,246 @@
+import argparse
+import os
+import sys
+import time
+from itertools import islice
+from math import isqrt
+from multiprocessing import Pool
+
+from difficulty import DifficultyLevel
+from generator import generate_puzzle
+from grader import grade, grade_level
+from puzzle_io import format_record, positive_int
+from transforms import variants
+
+"""
+    Command line tool for generating large puzzle sets offline
+
+    Puzzles are generated in chunks across a process pool and written to the output file
+    as each chunk finishes, one "<puzzle> <solution> <DIFFICULTY>" line per puzzle. With
+    --variants, every generated puzzle is followed by randomly transformed copies of
+    itself (see transforms.py), which are far cheaper to make than new puzzles.
+
+    Example:
+    python batch_generate.py --count 10000 --workers 8 -o puzzles.txt
+"""
+
+
+def generate_chunk(task):
+    """
+    Generate one chunk of puzzles. Runs inside a worker process.
+
+    Parameters:
+    task - tuple of (difficulty name, number of puzzles, board size, unique, graded,
+    variants per generated puzzle)
+
+    Return:
+    tuple of (worker pid, the formatted lines, seconds spent generating)
+    """
+    level_name, count, size, unique, graded, copies = task
+    level = DifficultyLevel[level_name]
+
+    start = time.perf_counter()
+    lines = []
+    while len(lines) < count:
+        label = level
+        if graded:
+            # Graded puzzles are always unique and pick their own number of cells to
+            # clear. When generation gives up before hitting the band it returns the
+            # closest puzzle it made, so the label comes from grading the result.
+            board, solution = generate_puzzle(size, band=level)
+            label = grade_level(grade(board))
+        else:
+            # The levels' cell counts are for 9x9 boards, so clear the same share of
+            # bigger or smaller ones
+            board, solution = generate_puzzle(size, level.value * size**2 // 81, unique)
+        lines.append(format_record(board, solution, label))
+
+        # Variants keep the givens and the techniques needed, so also the difficulty
+        extra = min(copies, count - len(lines))
+        for variant in islice(variants(board, solution), extra):
+            lines.append(format_record(*variant, label))
+    return os.getpid(), lines, time.perf_counter() - start
+
+
+def make_tasks(levels, count, chunk_size, size, unique, graded=False, copies=0):
+    """
+    Split the requested puzzles into chunks of at most chunk_size.
+
+    Return: list of tasks for generate_chunk
+    """
+    tasks = []
+    for level in levels:
+        for start in range(0, count, chunk_size):
+            tasks.append(
+                (
+                    level.name,
+                    min(chunk_size, count - start),
+                    size,
+                    unique,
+                    graded,
+                    copies,
+                )
+            )
+    return tasks
+
+
+def report(done, total, elapsed, worker_stats, out=sys.stderr):
+    """
+    Print the overall throughput and each worker's own rate (puzzles per second spent
+    generating).
+
+    Parameters:
+    done - puzzles written so far
+    total - puzzles requested
+    elapsed - wall clock seconds since the pool started
+    worker_stats - dict of worker pid to [puzzles, busy seconds]
+
+    Return: None
+    """
+    rates = "  ".join(
+        f"{pid}:{puzzles / busy:.1f}/s"
+        for pid, (puzzles, busy) in sorted(worker_stats.items())
+        if busy > 0
+    )
+    print(
+        f"{done}/{total} puzzles  {done / elapsed:.1f} puzzles/s  workers {rates}",
+        file=out,
+    )
+
+
+def run(args):
+    """
+    Generate the puzzles described by the parsed command line arguments.
+
+    Return: None
+    """
+    levels = [DifficultyLevel[name] for name in args.difficulty]
+    tasks = make_tasks(
+        levels,
+        args.count,
+        args.chunk_size,
+        args.size,
+        args.unique,
+        args.graded,
+        args.variants,
+    )
+    total = args.count * len(levels)
+
+    worker_stats = {}
+    done = 0
+    start = time.perf_counter()
+
+    with open(args.output, "w") as out, Pool(args.workers) as pool:
+        for pid, lines, busy in pool.imap_unordered(generate_chunk, tasks):
+            out.writelines(lines)
+            out.flush()
+
+            stats = worker_stats.setdefault(pid, [0, 0.0])
+            stats[0] += len(lines)
+            stats[1] += busy
+            done += len(lines)
+
+            if not args.quiet:
+                report(done, total, time.perf_counter() - start, worker_stats)
+
+    elapsed = time.perf_counter() - start
+    if args.quiet:
+        report(done, total, elapsed, worker_stats)
+    print(f"wrote {done} puzzles to {args.output} in {elapsed:.2f}s", file=sys.stderr)
+
+
+def board_size(text):
+    """
+    argparse type for board sizes: perfect squares from 4 to 25.
+
+    Parameters:
+    text - the argument as given on the command line
+
+    Return: int
+    """
+    value = int(text)
+    if not 4 <= value <= 25 or isqrt(value) ** 2 != value:
+        raise argparse.ArgumentTypeError(f"must be 4, 9, 16 or 25, not {value}")
+    return value
+
+
+def non_negative_int(text):
+    """
+    argparse type for counts that may be 0.
+
+    Parameters:
+    text - the argument as given on the command line
+
+    Return: int
+    """
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, not {value}")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles in bulk.")
+    parser.add_argument(
+        "-n",
+        "--count",
+        type=positive_int,
+        default=1000,
+        help="puzzles to generate per difficulty",
+    )
+    parser.add_argument(
+        "-d",
+        "--difficulty",
+        nargs="+",
+        choices=[level.name for level in DifficultyLevel],
+        default=[level.name for level in DifficultyLevel],
+        help="difficulties to generate (default: all)",
+    )
+    parser.add_argument(
+        "-o", "--output", default="puzzles.txt", help="file to write the puzzles to"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=positive_int,
+        default=50,
+        help="puzzles per unit of work",
+    )
+    parser.add_argument(
+        "--size", type=board_size, default=9, help="rows/columns per board"
+    )
+    parser.add_argument(
+        "--no-unique",
+        dest="unique",
+        action="store_false",
+        help="don't require puzzles to have a single solution",
+    )
+    parser.add_argument(
+        "--graded",
+        action="store_true",
+        help="pick puzzles by the techniques needed to solve them (see grader.py) "
+        "instead of by the number of cells removed; the few that miss their band "
+        "are labelled with the one they fall in",
+    )
+    parser.add_argument(
+        "--variants",
+        type=non_negative_int,
+        default=0,
+        metavar="N",
+        help="follow every generated puzzle with N transformed copies of it",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only report the final totals"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,404 @@
+from array import array
+from functools import lru_cache
+from math import isqrt
+
+"""
+    Compact storage for the state of a board being played
+
+    Every per-cell field lives in its own bytearray indexed by row * size + col, so a
+    9x9 board is four 81 byte buffers instead of grids of objects. Copying or resetting
+    a board is a handful of buffer copies.
+
+    The state also keeps running counts, updated on every change by looking only at the
+    changed cell's peers: the number of empty cells, how often each digit appears in
+    each unit (row, column or box), the set of cells that clash with a peer and the
+    candidates of every empty cell. So "is the board full", "is it valid" and "which
+    cells conflict" never need a scan.
+"""
+
+
+@lru_cache(maxsize=None)
+def cell_units(size):
+    """
+    Build the units every cell belongs to. Rows are units 0 to size - 1, columns come
+    next and boxes last (the same numbering validator.py uses).
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return:
+    tuple indexed by cell of (row unit, column unit, box unit)
+    """
+    box_length = isqrt(size)
+    return tuple(
+        (
+            row,
+            size + col,
+            2 * size + row // box_length * box_length + col // box_length,
+        )
+        for row in range(size)
+        for col in range(size)
+    )
+
+
+@lru_cache(maxsize=None)
+def unit_cells(size):
+    """
+    Build the cells in every unit, numbered like cell_units.
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return:
+    tuple indexed by unit of tuples of cell indexes, in row-major order
+    """
+    members = [[] for _ in range(3 * size)]
+    for index, units in enumerate(cell_units(size)):
+        for unit in units:
+            members[unit].append(index)
+    return tuple(tuple(cells) for cells in members)
+
+
+@lru_cache(maxsize=None)
+def cell_peers(size):
+    """
+    Build the peers of every cell, i.e. the other cells sharing one of its units.
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return:
+    tuple indexed by cell of tuples of peer cell indexes
+    """
+    units = cell_units(size)
+    members = unit_cells(size)
+    return tuple(
+        tuple(
+            sorted({peer for unit in units[index] for peer in members[unit]} - {index})
+        )
+        for index in range(size * size)
+    )
+
+
+class BoardState:
+    __slots__ = (
+        "size",
+        "box_length",
+        "givens",
+        "values",
+        "sketches",
+        "invalid",
+        "empty",
+        "counts",
+        "conflicts",
+        "candidates",
+        "marks",
+        "given_counts",
+        "given_conflicts",
+        "given_candidates",
+    )
+
+    def __init__(self, board):
+        """
+        Set up the state for a new puzzle.
+
+        Parameters:
+        board - 2D list of ints, 0 for empty cells (the format generate_sudoku returns)
+
+        Return: None
+        """
+        self.size = len(board)
+        self.box_length = isqrt(self.size)
+        area = self.size * self.size
+        # The puzzle's given numbers, which never change
+        self.givens = bytes(num for row in board for num in row)
+        # The numbers entered so far, including the givens
+        self.values = bytearray(area)
+        # The number sketched in each cell, 0 if none
+        self.sketches = bytearray(area)
+        # 1 for cells whose entered number was wrong
+        self.invalid = bytearray(area)
+        # The number of cells without a number
+        self.empty = area
+        # How often num appears in unit, at unit * (size + 1) + num
+        self.counts = bytearray(3 * self.size * (self.size + 1))
+        # Indexes of the cells whose number is repeated in one of their units
+        self.conflicts = set()
+        # Mask of the numbers no peer holds for every empty cell (bit n for number
+        # n), 0 for filled cells
+        self.candidates = array("I", [self.all_digits()]) * area
+        # The player's pencil marks for every cell, as masks like candidates
+        self.marks = array("I", [0]) * area
+
+        for index, num in enumerate(self.givens):
+            self.set_value(index, num)
+
+        # Snapshot of the counts for the givens alone, so reset is a copy
+        self.given_counts = bytes(self.counts)
+        self.given_conflicts = frozenset(self.conflicts)
+        self.given_candidates = array("I", self.candidates)
+
+    def index(self, row, col):
+        """
+        Get the buffer index of a cell.
+
+        Parameters:
+        row - row index of the cell
+        col - column index of the cell
+
+        Return: int
+        """
+        return row * self.size + col
+
+    def is_given(self, row, col):
+        """
+        Check if a cell holds one of the puzzle's given numbers.
+
+        Parameters:
+        row - row index of the cell
+        col - column index of the cell
+
+        Return: boolean
+        """
+        return self.givens[row * self.size + col] != 0
+
+    def set_value(self, index, num):
+        """
+        Set the number in a cell, updating the counts and conflicts. Placing a number
+        also removes it from the pencil marks of the cell's peers.
+
+        Parameters:
+        index - buffer index of the cell
+        num - the number, 0 to clear the cell
+
+        Return:
+        int with bit k set if the pencil mark was removed from the k-th peer (in
+        cell_peers order), so the removal can be undone
+        """
+        values = self.values
+        old = values[index]
+        if old == num:
+            return 0
+
+        counts = self.counts
+        candidates = self.candidates
+        marks = self.marks
+        bit = 1 << num
+        cleared = 0
+        stride = self.size + 1
+        units = cell_units(self.size)[index]
+
+        if old:
+            for unit in units:
+                counts[unit * stride + old] -= 1
+            self.conflicts.discard(index)
+        else:
+            self.empty -= 1
+
+        values[index] = num
+
+        if num:
+            for unit in units:
+                counts[unit * stride + num] += 1
+        else:
+            self.empty += 1
+
+        # Only peers holding the old or new number can start or stop conflicting, and
+        # only empty peers' candidates change
+        for k, peer in enumerate(cell_peers(self.size)[index]):
+            value = values[peer]
+            if not value:
+                if num:
+                    candidates[peer] &= ~bit
+                    if marks[peer] & bit:
+                        marks[peer] ^= bit
+                        cleared |= 1 << k
+                if old and not self.is_used(peer, old):
+                    candidates[peer] |= 1 << old
+                continue
+            if value == num:
+                self.conflicts.add(peer)
+                self.conflicts.add(index)
+            elif value == old and peer in self.conflicts:
+                if not self.is_conflicting(peer):
+                    self.conflicts.discard(peer)
+
+        if num:
+            candidates[index] = 0
+        else:
+            candidates[index] = sum(
+                1 << n for n in range(1, self.size + 1) if not self.is_used(index, n)
+            )
+        return cleared
+
+    def restore_marks(self, index, num, cleared):
+        """
+        Put back the pencil marks set_value removed from a cell's peers.
+
+        Parameters:
+        index - buffer index of the cell the number was placed in
+        num - the number placed
+        cleared - the mask set_value returned
+
+        Return: None
+        """
+        if not cleared:
+            return
+        for k, peer in enumerate(cell_peers(self.size)[index]):
+            if cleared >> k & 1:
+                self.marks[peer] |= 1 << num
+
+    def is_used(self, index, num):
+        """
+        Check if a number is already in one of a cell's units (row, column or box).
+
+        Parameters:
+        index - buffer index of the cell
+        num - the number to look for
+
+        Return: boolean
+        """
+        stride = self.size + 1
+        return any(
+            self.counts[unit * stride + num] for unit in cell_units(self.size)[index]
+        )
+
+    def all_digits(self):
+        """
+        Get the mask with the bit of every number (1 to size) set.
+
+        Parameters: None
+        Return: int
+        """
+        return ((1 << self.size) - 1) << 1
+
+    def save_cell(self, index):
+        """
+        Get every field stored for a cell, e.g. to record a move.
+
+        Parameters:
+        index - buffer index of the cell
+
+        Return: (value, sketch, invalid, marks) tuple
+        """
+        return (
+            self.values[index],
+            self.sketches[index],
+            self.invalid[index],
+            self.marks[index],
+        )
+
+    def restore_cell(self, index, saved):
+        """
+        Put back the fields of a cell returned by save_cell.
+
+        Parameters:
+        index - buffer index of the cell
+        saved - (value, sketch, invalid, marks) tuple
+
+        Return:
+        the mask returned by set_value
+        """
+        value, sketch, invalid, marks = saved
+        cleared = self.set_value(index, value)
+        self.sketches[index] = sketch
+        self.invalid[index] = invalid
+        self.marks[index] = marks
+        return cleared
+
+    def is_conflicting(self, index):
+        """
+        Check if a cell's number is repeated in one of its units.
+
+        Parameters:
+        index - buffer index of the cell
+
+        Return: boolean
+        """
+        num = self.values[index]
+        if not num:
+            return False
+        stride = self.size + 1
+        return any(
+            self.counts[unit * stride + num] > 1
+            for unit in cell_units(self.size)[index]
+        )
+
+    def is_full(self):
+        """
+        Check if every cell has a number.
+
+        Parameters: None
+        Return: boolean
+        """
+        return self.empty == 0
+
+    def is_valid(self):
+        """
+        Check if no number is repeated in any row, column or box. Empty cells are
+        allowed.
+
+        Parameters: None
+        Return: boolean
+        """
+        return not self.conflicts
+
+    def is_complete(self):
+        """
+        Check if the board is full and valid, i.e. solved.
+
+        Parameters: None
+        Return: boolean
+        """
+        return self.empty == 0 and not self.conflicts
+
+    def reset(self):
+        """
+        Clear everything entered since the puzzle started.
+
+        Parameters: None
+        Return: None
+        """
+        self.values[:] = self.givens
+        self.sketches[:] = bytes(len(self.givens))
+        self.invalid[:] = bytes(len(self.givens))
+        self.counts[:] = self.given_counts
+        self.conflicts = set(self.given_conflicts)
+        self.candidates[:] = self.given_candidates
+        self.marks = array("I", [0]) * len(self.givens)
+        self.empty = self.givens.count(0)
+
+    def copy(self):
+        """
+        Get an independent copy of the state.
+
+        Parameters: None
+        Return: BoardState
+        """
+        state = BoardState.__new__(BoardState)
+        state.size = self.size
+        state.box_length = self.box_length
+        state.givens = self.givens
+        state.values = bytearray(self.values)
+        state.sketches = bytearray(self.sketches)
+        state.invalid = bytearray(self.invalid)
+        state.empty = self.empty
+        state.counts = bytearray(self.counts)
+        state.conflicts = set(self.conflicts)
+        state.given_counts = self.given_counts
+        state.candidates = array("I", self.candidates)
+        state.marks = array("I", self.marks)
+        state.given_conflicts = self.given_conflicts
+        state.given_candidates = self.given_candidates
+        return state
+
+    def to_lists(self):
+        """
+        Get the numbers entered so far.
+
+        Parameters: None
+        Return:
+        2D list of ints, 0 for empty cells
+        """
+        size = self.size
+        return [list(self.values[row * size : (row + 1) * size]) for row in range(size)]
@@ -0,0 +1,420 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from functools import lru_cache
+from itertools import permutations
+from math import isqrt
+from multiprocessing import Pool
+
+import numpy as np
+
+from puzzle_io import DIGITS, line_to_board, positive_int, read_chunks
+from validator import unit_name, validate_grids
+
+"""
+    Canonical forms of puzzles, for spotting the same puzzle in disguise
+
+    Two puzzles are equivalent when one turns into the other by relabelling digits,
+    reordering rows within a band, bands, columns within a stack or stacks, and
+    transposing (see transforms.py). The canonical form is the smallest one-line board
+    (with 0 below every digit) among all of a puzzle's equivalents, so equivalent
+    puzzles always share it.
+
+    The result is built a row at a time. Every choice of transpose and column order is
+    a candidate; each step extends every candidate by each row it may place next,
+    relabels the new digits in the order they appear and keeps only the candidates
+    whose row is smallest. Candidates are numpy arrays, so each step is a few array
+    operations rather than a loop over the 2 * 1296 column orders of a 9x9 grid.
+
+    Run as a script to drop duplicates from a puzzle set, streaming it through an
+    on-disk index of the canonical forms seen so far, so memory use doesn't grow with
+    the set and later runs also skip puzzles kept by earlier ones.
+
+    Example:
+    python canonical.py puzzles.txt -o unique.txt --index seen.db --workers 8
+"""
+
+
+@lru_cache(maxsize=None)
+def line_orders(size):
+    """
+    Build every order of a grid's columns (or rows) that keeps the stacks together.
+
+    Parameters:
+    size - the number of rows/columns of the grid
+
+    Return:
+    uint8 array of shape (orders, size), each row holding the source line of every
+    line of the result
+    """
+    box_length = isqrt(size)
+    within = list(permutations(range(box_length)))
+    orders = []
+    for stacks in permutations(range(box_length)):
+        for choice in np.ndindex(*[len(within)] * box_length):
+            orders.append(
+                [
+                    stack * box_length + line
+                    for stack, k in zip(stacks, choice)
+                    for line in within[k]
+                ]
+            )
+    return np.array(orders, dtype=np.uint8)
+
+
+def canonical_grid(board):
+    """
+    Find the canonical form of a puzzle or solved grid.
+
+    Parameters:
+    board - 2D list (or array) of ints, 0 for empty cells. It must not break a rule,
+            as a repeated digit in a row would be relabelled twice.
+
+    Return:
+    uint8 array of shape (size, size)
+
+    Raises:
+    ValueError for boards bigger than 9x9, which have too many column orders
+    """
+    grid = np.asarray(board, dtype=np.intp)
+    size = len(grid)
+    box_length = isqrt(size)
+    if size > 9:
+        raise ValueError("canonical forms are only supported up to 9x9 boards")
+
+    orders = line_orders(size).astype(np.intp)
+    cells = np.concatenate((grid.ravel(), grid.T.ravel()))
+    lines = np.arange(size)
+    band_of = lines // box_length
+
+    # One candidate per (transpose, column order) to start with. Besides those, a
+    # candidate is the set of rows placed so far (as a bit mask) and the labels given
+    # to the digits seen so far.
+    count = 2 * len(orders)
+    flipped = np.repeat(np.arange(2), len(orders))
+    cols = np.tile(np.arange(len(orders)), 2)
+    used = np.zeros(count, dtype=np.intp)
+    labels = np.zeros((count, size + 1), dtype=np.intp)
+    # Every candidate left has written the same cells so far, so they've all seen the
+    # same number of distinct digits
+    next_label = 1
+
+    result = np.empty((size, size), dtype=np.uint8)
+    for k in range(size):
+        # The rows each candidate may place next: any row of an untouched band when a
+        # band starts, otherwise an unused row of the band that has k % box_length
+        # rows placed
+        placed = used[:, np.newaxis] >> lines & 1
+        band_counts = placed.reshape(-1, box_length, box_length).sum(axis=2)
+        allowed = (placed == 0) & (band_counts[:, band_of] == k % box_length)
+        state, row = np.nonzero(allowed)
+        starts = (flipped[state] * size + row) * size
+        col_orders = orders[cols[state]]
+        label_starts = state * (size + 1)
+
+        # Write the row a cell at a time, dropping the candidates that write a bigger
+        # cell, so most of them are gone after a cell or two
+        keep = np.arange(len(state))
+        for col in range(size):
+            values = cells[starts[keep] + col_orders[keep, col]]
+            mapped = labels.ravel()[label_starts[keep] + values]
+            written = np.where((values > 0) & (mapped == 0), next_label, mapped)
+            lowest = written.min()
+            keep = keep[written == lowest]
+            result[k, col] = lowest
+            if lowest == next_label:
+                next_label += 1
+
+        # Label the new digits of the candidates left
+        values = cells[starts[keep, np.newaxis] + col_orders[keep]]
+        state = state[keep]
+        labels = labels[state]
+        labels[np.arange(len(keep))[:, np.newaxis], values] = result[k]
+        flipped = flipped[state]
+        cols = cols[state]
+        used = used[state] | 1 << row[keep]
+
+        # Candidates that only differ in the order their tied rows were placed in
+        # will place the same rows from here on, so keep one of each
+        merged = flipped | cols << 1 | used << 12 | labels[:, 1:] @ 16**lines << 21
+        _, first = np.unique(merged, return_index=True)
+        if len(first) < len(merged):
+            flipped, cols, used, labels = (
+                flipped[first],
+                cols[first],
+                used[first],
+                labels[first],
+            )
+
+    return result
+
+
+def canonical_line(board):
+    """
+    Get the canonical form of a board as a one-line board (see puzzle_io).
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+
+    Return: str
+    """
+    return "".join(DIGITS[num] for num in canonical_grid(board).flat)
+
+
+def canonical_key(board):
+    """
+    Hash the canonical form of a board, for the dedup index.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+
+    Return: 16 bytes
+    """
+    return hashlib.blake2b(canonical_grid(board).tobytes(), digest_size=16).digest()
+
+
+class DedupIndex:
+    def __init__(self, path, batch_size=10000):
+        """
+        Open (or create) an index of the canonical keys seen so far. The keys live in
+        an SQLite table, so only its page cache is held in memory.
+
+        Parameters:
+        path - the index file, or ":memory:" for a throwaway index
+        batch_size - the number of additions committed at a time
+
+        Return: None
+        """
+        self.db = sqlite3.connect(path)
+        # The index can always be rebuilt from the puzzle sets, so trade durability
+        # for speed
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("PRAGMA journal_mode = MEMORY")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY) WITHOUT ROWID"
+        )
+        self.batch_size = batch_size
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def __contains__(self, key):
+        return (
+            self.db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone()
+            is not None
+        )
+
+    def add(self, key):
+        """
+        Add a key to the index.
+
+        Parameters:
+        key - bytes from canonical_key
+
+        Return:
+        boolean, True if the key was new
+        """
+        cursor = self.db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (key,))
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.commit()
+        return cursor.rowcount == 1
+
+    def commit(self):
+        """
+        Write the pending additions to disk.
+
+        Parameters: None
+        Return: None
+        """
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        """
+        Commit and close the index.
+
+        Parameters: None
+        Return: None
+        """
+        self.commit()
+        self.db.close()
+
+
+def key_chunk(lines):
+    """
+    Compute the canonical keys of one chunk of a puzzle set. Runs inside a worker
+    process.
+
+    Parameters:
+    lines - list of lines starting with a one-line board (e.g. written by
+    format_record)
+
+    Return:
+    tuple of (lines, list of their keys, list of error messages), with a None key for
+    every line that can't be put in canonical form and a None error for the rest
+    """
+    keys = [None] * len(lines)
+    errors = [None] * len(lines)
+    # Board size -> list of (position in the chunk, board)
+    by_size = {}
+    for position, line in enumerate(lines):
+        try:
+            board = line_to_board(line.split()[0])
+        except ValueError as e:
+            errors[position] = str(e)
+        else:
+            by_size.setdefault(len(board), []).append((position, board))
+
+    for size, boards in by_size.items():
+        # canonical_grid can't relabel a digit that's repeated in a unit
+        _, first_units = validate_grids([board for _, board in boards])
+        for (position, board), unit in zip(boards, first_units):
+            if unit >= 0:
+                errors[position] = f"a number is repeated in {unit_name(unit, size)}"
+                continue
+            try:
+                keys[position] = canonical_key(board)
+            except ValueError as e:
+                errors[position] = str(e)
+
+    return lines, keys, errors
+
+
+def run(args):
+    """
+    Drop the duplicate puzzles of the set described by the parsed command line
+    arguments.
+
+    Return: None
+    """
+    done = kept = skipped = 0
+    start = time.perf_counter()
+
+    index_path = args.index
+    if index_path is None:
+        # A throwaway index on disk, so memory use stays flat however big the set is.
+        # It goes next to the output, as the set's own directory may be read-only.
+        fd, index_path = tempfile.mkstemp(
+            suffix=".db",
+            prefix=".seen-",
+            dir=os.path.dirname(os.path.abspath(args.output)) if args.output else None,
+        )
+        os.close(fd)
+
+    out = open(args.output, "w") if args.output else None
+    try:
+        with (
+            DedupIndex(index_path) as index,
+            open(args.source) as source,
+            Pool(args.workers) as pool,
+        ):
+            # imap keeps the output in the same order as the input
+            chunks = read_chunks(source, args.chunk_size)
+            for lines, keys, errors in pool.imap(key_chunk, chunks):
+                for line, key, error in zip(lines, keys, errors):
+                    done += 1
+                    if error is not None:
+                        # Bad puzzles are reported and left out rather than ending
+                        # the run
+                        print(f"puzzle {done}: {error}", file=sys.stderr)
+                        skipped += 1
+                    elif index.add(key):
+                        kept += 1
+                        if out is not None:
+                            out.write(line)
+    finally:
+        if out is not None:
+            out.close()
+        if args.index is None:
+            os.remove(index_path)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{done} puzzles  {done - kept - skipped} duplicates  {skipped} skipped"
+        f"  {done / elapsed:.1f} puzzles/s",
+        file=sys.stderr,
+    )
+
+
+def benchmark(count=200, removed=(0, 50)):
+    """
+    Print how many boards per second can be put in canonical form.
+
+    Parameters:
+    count - the number of boards to time per setting
+    removed - the numbers of cells to clear, 0 timing solved grids
+
+    Return: None
+    """
+    from generator import generate_puzzle
+
+    for holes in removed:
+        boards = [generate_puzzle(9, holes)[0] for _ in range(count)]
+        start = time.perf_counter()
+        for board in boards:
+            canonical_key(board)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{81 - holes} givens: {count / elapsed:8.1f} boards/s"
+            f"  ({elapsed / count * 1000:.2f} ms each)"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Drop puzzles that are the same up to symmetry from a puzzle set."
+    )
+    parser.add_argument(
+        "source", nargs="?", help="puzzle set, one puzzle at the start of each line"
+    )
+    parser.add_argument("-o", "--output", help="file to write the unique puzzles to")
+    parser.add_argument(
+        "-i",
+        "--index",
+        help="file keeping the canonical forms seen, shared across runs, or "
+        "':memory:' to keep them in memory (default: a temporary file next to the "
+        "output, or in the temporary directory, for this run only)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=positive_int,
+        default=200,
+        help="puzzles per unit of work",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="time canonicalization instead of reading a puzzle set",
+    )
+    args = parser.parse_args(argv)
+    if not args.benchmark and args.source is None:
+        parser.error("a puzzle set is required unless --benchmark is given")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark:
+        benchmark()
+    else:
+        run(args)
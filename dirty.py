@@ -0,0 +1,69 @@
+import pygame
+
+"""
+    Tracks which parts of the window changed since the last frame, so only those
+    regions are redrawn and pushed to the display
+"""
+
+
+class DirtyRegions:
+    def __init__(self):
+        """
+        Start with the whole window dirty, so the first frame is drawn in full.
+
+        Parameters: None
+        Return: None
+        """
+        self.rects = []
+        self.full = True
+
+    def __bool__(self):
+        return self.full or bool(self.rects)
+
+    def add(self, rect):
+        """
+        Mark a region of the window as changed.
+
+        Parameters:
+        rect - pygame.Rect (or rect-like tuple) of the region
+
+        Return: None
+        """
+        if not self.full:
+            self.rects.append(pygame.Rect(rect))
+
+    def invalidate(self):
+        """
+        Mark the whole window as changed, e.g. after it was exposed or resized.
+
+        Parameters: None
+        Return: None
+        """
+        self.full = True
+        self.rects.clear()
+
+    def take(self):
+        """
+        Get the changed regions and start tracking the next frame.
+
+        Parameters: None
+        Return:
+        list of pygame.Rects to redraw, or None if the whole window must be redrawn
+        """
+        if self.full:
+            rects = None
+        else:
+            # Overlapping rects (e.g. neighbouring cells) are merged so fewer regions
+            # have to be redrawn
+            rects = []
+            for rect in self.rects:
+                for i, other in enumerate(rects):
+                    if rect.colliderect(other):
+                        rects[i] = other.union(rect)
+                        break
+                else:
+                    rects.append(rect)
+
+        self.full = False
+        self.rects = []
+        return rects
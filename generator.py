@@ -0,0 +1,637 @@
+import random
+import threading
+from copy import deepcopy
+from functools import lru_cache
+
+from difficulty import DifficultyLevel
+from grader import grade, grade_level
+
+"""
+    Puzzle generation, free of pygame
+
+    SudokuGenerator and the functions that make puzzles with it only need the grader
+    and plain Python, so batch jobs, worker processes and servers can import them
+    without loading pygame. The game's Cell and Board classes live in
+    sudoku_generator.py, which re-exports everything here.
+"""
+
+
+# Cells to clear (out of 81) when generating a puzzle for a graded difficulty. The
+# harder the band, the more cells have to go before its techniques become necessary.
+BAND_REMOVED = {
+    DifficultyLevel.EASY: 30,
+    DifficultyLevel.MEDIUM: 50,
+    DifficultyLevel.HARD: 81,
+}
+
+# Search steps generate_graded spends at most by default. A 9x9 HARD attempt takes about
+# 4500, so this is around five attempts and keeps the worst case under 200 ms.
+GRADED_MAX_NODES = 25000
+
+
+"""
+    Used to generate a sudoku board
+"""
+
+
+class SudokuGenerator:
+    full_board = None
+
+    """
+        create a sudoku board - initialize class variables and set up the 2D board
+        This should initialize:
+        self.row_length		- the length of each row
+        self.removed_cells	- the total number of cells to be removed
+        self.board			- a 2D list of ints to represent the board
+        self.box_length		- the square root of row_length
+
+        Parameters:
+    row_length is the number of rows/columns of the board (a perfect square, e.g. 4, 9, 16, 25)
+    removed_cells is an integer value - the number of cells to be removed
+    seed is an optional seed; the same seed always generates the same board
+    rng is an optional random.Random to draw from instead (overrides seed)
+
+        Return:
+        None
+    """
+
+    def __init__(self, row_length, removed_cells, seed=None, rng=None):
+        self.row_length = row_length
+        self.removed_cells = removed_cells
+        # Without a seed or rng, the global random module is used
+        if rng is None:
+            rng = random if seed is None else random.Random(seed)
+        self.rng = rng
+        self.board = [[0 for _ in range(row_length)] for _ in range(row_length)]
+        self.box_length = int(self.row_length**0.5)
+        # Bitmasks of the digits used in each row, column and box (bit n set -> n is used)
+        self.row_masks = [0] * row_length
+        self.col_masks = [0] * row_length
+        self.box_masks = [0] * row_length
+        # Search steps fill_remaining may take before giving up (None -> no limit)
+        self.node_budget = None
+        # Search steps taken so far, by every search
+        self.nodes = 0
+        # Total search steps remove_cells_unique may use before it stops removing cells
+        # (None -> no limit)
+        self.nodes_limit = None
+
+    """
+	Returns a 2D python list of numbers which represents the board
+
+	Parameters: None
+	Return: list[list]
+    """
+
+    def get_board(self):
+        return self.board
+
+    @classmethod
+    def get_full_board(cls):
+        return cls.full_board
+
+    """
+	Displays the board to the console
+    This is not strictly required, but it may be useful for debugging purposes
+
+	Parameters: None
+	Return: None
+    """
+
+    def print_board(self):
+        for row in self.board:
+            print(" ".join(str(num) if num != 0 else "." for num in row))
+
+    """
+	Determines if num is contained in the specified row (horizontal) of the board
+    If num is already in the specified row, return False. Otherwise, return True
+
+	Parameters:
+	row is the index of the row we are checking
+	num is the value we are looking for in the row
+
+	Return: boolean
+    """
+
+    def valid_in_row(self, row, num):
+        return not self.row_masks[row] >> num & 1
+
+    """
+	Determines if num is contained in the specified column (vertical) of the board
+    If num is already in the specified col, return False. Otherwise, return True
+
+	Parameters:
+	col is the index of the column we are checking
+	num is the value we are looking for in the column
+
+	Return: boolean
+    """
+
+    def valid_in_col(self, col, num):
+        return not self.col_masks[col] >> num & 1
+
+    """
+	Determines if num is contained in the box specified on the board
+    If num is in the specified box starting at (row_start, col_start), return False.
+    Otherwise, return True
+
+	Parameters:
+	row_start and col_start are the starting indices of the box to check
+	i.e. the box is from (row_start, col_start) to
+	(row_start+box_length-1, col_start+box_length-1)
+	num is the value we are looking for in the box
+
+	Return: boolean
+    """
+
+    def valid_in_box(self, row_start, col_start, num):
+        return not self.box_masks[self.box_index(row_start, col_start)] >> num & 1
+
+    """
+    Determines if it is valid to enter num at (row, col) in the board
+    This is done by checking that num is unused in the appropriate, row, column, and box
+
+	Parameters:
+	row and col are the row index and col index of the cell to check in the board
+	num is the value to test if it is safe to enter in this cell
+
+	Return: boolean
+    """
+
+    def is_valid(self, row, col, num):
+        used = (
+            self.row_masks[row]
+            | self.col_masks[col]
+            | self.box_masks[self.box_index(row, col)]
+        )
+        return not used >> num & 1
+
+    """
+    Returns the index of the box containing (row, col), counting boxes left to right
+    and top to bottom
+
+	Parameters:
+	row and col are the row index and col index of a cell in the board
+
+	Return: int
+    """
+
+    def box_index(self, row, col):
+        return row // self.box_length * self.box_length + col // self.box_length
+
+    """
+    Sets the cell at (row, col) to num and keeps the row, column and box masks in sync
+    A num of 0 clears the cell
+
+	Parameters:
+	row and col are the row index and col index of the cell to set
+	num is the value to enter in this cell
+
+	Return: None
+    """
+
+    def set_value(self, row, col, num):
+        box = self.box_index(row, col)
+        old = self.board[row][col]
+        if old:
+            keep = ~(1 << old)
+            self.row_masks[row] &= keep
+            self.col_masks[col] &= keep
+            self.box_masks[box] &= keep
+        if num:
+            bit = 1 << num
+            self.row_masks[row] |= bit
+            self.col_masks[col] |= bit
+            self.box_masks[box] |= bit
+        self.board[row][col] = num
+
+    """
+    Fills the specified box with values
+    For each position, generates a random digit which has not yet been used in the box
+
+	Parameters:
+	row_start and col_start are the starting indices of the box to check
+	i.e. the box is from (row_start, col_start) to
+	(row_start+box_length-1, col_start+box_length-1)
+
+	Return: None
+    """
+
+    def fill_box(self, row_start, col_start):
+        nums = list(range(1, self.row_length + 1))
+        self.rng.shuffle(nums)
+        for row in range(row_start, row_start + self.box_length):
+            for col in range(col_start, col_start + self.box_length):
+                self.set_value(row, col, nums.pop())
+
+    """
+    Fills the boxes along the main diagonal of the board
+    These boxes don't share a row or column, so they can be filled independently
+    e.g. on a 9x9 board these are the boxes which start at (0,0), (3,3), and (6,6)
+
+	Parameters: None
+	Return: None
+    """
+
+    def fill_diagonal(self):
+        for i in range(0, self.row_length, self.box_length):
+            self.fill_box(i, i)
+
+    """
+    Fills the remaining cells of the board
+    Should be called after the diagonal boxes have been filled
+    Searches with minimum-remaining-values ordering (see can_complete), which keeps
+    16x16 and 25x25 boards from backtracking exponentially
+
+	Parameters:
+	max_nodes is the most search steps to take before giving up (None -> no limit)
+
+	Return:
+	boolean (whether or not we could solve the board)
+    """
+
+    def fill_remaining(self, max_nodes=None):
+        empty = [
+            (row, col, self.box_index(row, col))
+            for row in range(self.row_length)
+            for col in range(self.row_length)
+            if self.board[row][col] == 0
+        ]
+        self.node_budget = max_nodes
+        try:
+            return self.can_complete(empty, keep=True)
+        finally:
+            self.node_budget = None
+
+    """
+    Constructs a solution by calling fill_diagonal and fill_remaining
+    Starts over with new diagonal boxes if the search can't finish quickly: on 4x4
+    boards the diagonal boxes can clash, and on large boards a rare unlucky start can
+    take far longer than simply trying another one
+
+	Parameters: None
+	Return: None
+    """
+
+    def fill_values(self):
+        self.fill_diagonal()
+        while not self.fill_remaining(max_nodes=4 * self.row_length**2):
+            for row in range(self.row_length):
+                for col in range(self.row_length):
+                    self.set_value(row, col, 0)
+            self.fill_diagonal()
+
+    """
+    Removes the appropriate number of cells from the board
+    This is done by setting some values to 0
+    Should be called after the entire solution has been constructed
+    i.e. after fill_values has been called
+
+    NOTE: Be careful not to 'remove' the same cell multiple times
+    i.e. if a cell is already 0, it cannot be removed again
+
+	Parameters:
+	unique is whether every removal must leave the puzzle with exactly one solution
+	(see remove_cells_unique)
+
+	Return: None
+    """
+
+    def remove_cells(self, unique=False):  # Sagan
+        SudokuGenerator.full_board = deepcopy(self.board)
+
+        if unique:
+            self.remove_cells_unique()
+            return
+
+        empty_cells = self.removed_cells
+
+        a = [0] * empty_cells + [1] * (self.row_length**2 - empty_cells)
+
+        self.rng.shuffle(a)
+
+        for i in range(self.row_length):
+            for j in range(self.row_length):
+                if a[i * self.row_length + j] == 0:
+                    self.set_value(i, j, 0)
+
+    """
+    Removes cells in random order, keeping a removal only if the puzzle still has exactly
+    one solution. Stops after removed_cells removals, or earlier if no more cells can be
+    removed without losing uniqueness or the search steps taken reach nodes_limit
+
+    The row, column and box masks always describe the current puzzle, so each check starts
+    from the previous step's candidate state instead of re-solving the board from scratch
+
+	Parameters: None
+	Return: None
+    """
+
+    def remove_cells_unique(self):
+        cells = [
+            (row, col) for row in range(self.row_length) for col in range(self.row_length)
+        ]
+        self.rng.shuffle(cells)
+
+        empty = []
+        for row, col in cells:
+            if len(empty) == self.removed_cells:
+                break
+            if self.nodes_limit is not None and self.nodes >= self.nodes_limit:
+                break
+
+            num = self.board[row][col]
+            self.set_value(row, col, 0)
+            empty.append((row, col, self.box_index(row, col)))
+
+            # The search is capped so large boards can't stall on one hard check; a
+            # capped check just keeps the cell, which never costs uniqueness
+            if self.has_other_solution(row, col, num, empty, 4 * self.row_length**2):
+                self.set_value(row, col, num)
+                empty.pop()
+
+    """
+    Determines if the puzzle has a solution where the cell at (row, col) is not num
+    Used after clearing a cell to check that num is still the only answer for it
+
+	Parameters:
+	row and col are the row index and col index of the cleared cell
+	num is the value the cell held in the solution
+	empty is a list of the (row, col, box) of every empty cell in the board
+	max_nodes is the most search steps to take (None -> no limit). Running out counts
+	as finding another solution, so a True result is only a "maybe"
+
+	Return: boolean
+    """
+
+    def has_other_solution(self, row, col, num, empty, max_nodes=None):
+        used = (
+            self.row_masks[row]
+            | self.col_masks[col]
+            | self.box_masks[self.box_index(row, col)]
+        )
+        others = ~used & ~(1 << num) & self.all_digits()
+
+        # If every other digit is already in one of the cell's units, num is forced and
+        # there is nothing to search
+        self.node_budget = max_nodes
+        try:
+            while others:
+                bit = others & -others
+                others ^= bit
+                self.set_value(row, col, bit.bit_length() - 1)
+                found = self.can_complete(empty)
+                self.set_value(row, col, 0)
+                if found or (max_nodes is not None and self.node_budget < 0):
+                    return True
+            return False
+        finally:
+            self.node_budget = None
+
+    """
+    Determines if the empty cells can be filled in without breaking any rule
+    Always branches on the empty cell with the fewest candidates left, using the row,
+    column and box masks as candidate bitsets
+
+	Parameters:
+	empty is a list of the (row, col, box) of the cells to fill (filled cells are skipped)
+	keep is whether to leave the cells filled in when a solution is found, otherwise the
+	board and masks are restored before returning
+
+	Return: boolean
+    """
+
+    def can_complete(self, empty, keep=False):
+        self.nodes += 1
+        if self.node_budget is not None:
+            self.node_budget -= 1
+            if self.node_budget < 0:
+                return False
+
+        board = self.board
+        row_masks, col_masks, box_masks = self.row_masks, self.col_masks, self.box_masks
+        best = None
+        best_candidates = 0
+        best_count = self.row_length + 1
+        all_digits = self.all_digits()
+
+        for row, col, box in empty:
+            if board[row][col]:
+                continue
+            candidates = all_digits & ~(row_masks[row] | col_masks[col] | box_masks[box])
+            count = candidates.bit_count()
+            if count < best_count:
+                if count == 0:
+                    return False
+                best, best_candidates, best_count = (row, col, box), candidates, count
+                if count == 1:
+                    break
+
+        if best is None:
+            return True
+
+        row, col, _ = best
+        while best_candidates:
+            bit = best_candidates & -best_candidates
+            best_candidates ^= bit
+            self.set_value(row, col, bit.bit_length() - 1)
+            if self.can_complete(empty, keep):
+                if not keep:
+                    self.set_value(row, col, 0)
+                return True
+            self.set_value(row, col, 0)
+        return False
+
+    """
+    Returns a mask with the bit of every digit (1 to row_length) set
+
+	Parameters: None
+	Return: int
+    """
+
+    def all_digits(self):
+        return ((1 << self.row_length) - 1) << 1
+
+
+"""
+DO NOT CHANGE
+Provided for students
+Given a number of rows and number of cells to remove, this function:
+1. creates a SudokuGenerator
+2. fills its values and saves this as the solved state
+3. removes the appropriate number of cells
+4. returns the representative 2D Python Lists of the board and solution
+
+Parameters:
+size is the number of rows/columns of the board (a perfect square, 9 for the game)
+removed is the number of cells to clear (set to 0), ignored when band is given
+unique is whether the puzzle must keep exactly one solution (may clear fewer cells)
+band is an optional DifficultyLevel the puzzle's grade must fall in (see generate_graded);
+the band decides how many cells are cleared
+seed is an optional seed; the same arguments and seed always give the same board
+rng is an optional random.Random to draw from instead (overrides seed)
+
+Return: list[list] (a 2D Python list to represent the board)
+"""
+
+
+def generate_sudoku(size, removed, unique=False, band=None, seed=None, rng=None):
+    if band is not None:
+        return generate_graded(size, band, seed=seed, rng=rng)[0]
+    sudoku = SudokuGenerator(size, removed, seed, rng)
+    sudoku.fill_values()
+    board = sudoku.get_board()
+    sudoku.remove_cells(unique)
+    board = sudoku.get_board()
+    return board
+
+
+"""
+Same as generate_sudoku, but also returns the solved board the puzzle was made from
+
+Parameters:
+size is the number of rows/columns of the board (a perfect square, 9 for the game)
+removed is the number of cells to clear (set to 0), ignored when band is given
+unique is whether the puzzle must keep exactly one solution (may clear fewer cells)
+band is an optional DifficultyLevel the puzzle's grade must fall in (see generate_graded);
+the band decides how many cells are cleared
+seed is an optional seed; the same arguments and seed always give the same puzzle
+rng is an optional random.Random to draw from instead (overrides seed)
+
+Return: tuple of (board, solution), both 2D Python lists
+"""
+
+
+def generate_puzzle(size, removed=None, unique=False, band=None, seed=None, rng=None):
+    if band is not None:
+        return generate_graded(size, band, seed=seed, rng=rng)
+    sudoku = SudokuGenerator(size, removed, seed, rng)
+    sudoku.fill_values()
+    solution = deepcopy(sudoku.get_board())
+    sudoku.remove_cells(unique)
+    return sudoku.get_board(), solution
+
+
+"""
+Generates unique puzzles until one's grade (the hardest technique needed to solve it,
+see grader.py) falls in band. The band decides how many cells are cleared (see
+BAND_REMOVED). If none does before attempts or max_nodes run out, the closest one is
+used. max_nodes counts search steps rather than time, so a seed still fixes the result
+
+Parameters:
+size is the number of rows/columns of the board (a perfect square, 9 for the game)
+band is the DifficultyLevel to aim for
+attempts is the most puzzles to generate
+max_nodes is the most search steps to spend over every attempt (None -> no limit); an
+attempt that runs out stops clearing cells
+seed is an optional seed; the same arguments and seed always give the same puzzle
+rng is an optional random.Random to draw from instead (overrides seed)
+
+Return: tuple of (board, solution), both 2D Python lists
+"""
+
+
+def generate_graded(
+    size, band, attempts=20, max_nodes=GRADED_MAX_NODES, seed=None, rng=None
+):
+    removed = BAND_REMOVED[band] * size**2 // 81
+    # Every attempt draws from the same generator, so a seed fixes the whole sequence
+    if rng is None:
+        rng = random if seed is None else random.Random(seed)
+
+    levels = list(DifficultyLevel)
+    closest = None
+    nodes = 0
+    for _ in range(attempts):
+        sudoku = SudokuGenerator(size, removed, rng=rng)
+        if max_nodes is not None:
+            sudoku.nodes_limit = max_nodes - nodes
+        sudoku.fill_values()
+        solution = deepcopy(sudoku.get_board())
+        sudoku.remove_cells(unique=True)
+        board = sudoku.get_board()
+        nodes += sudoku.nodes
+
+        distance = abs(levels.index(grade_level(grade(board))) - levels.index(band))
+        if distance == 0:
+            return board, solution
+        if closest is None or distance < closest[0]:
+            closest = (distance, board, solution)
+        if max_nodes is not None and nodes >= max_nodes:
+            break
+    return closest[1], closest[2]
+
+
+# Concurrent requests for the same seed (e.g. many players starting the daily puzzle at
+# once) wait on that seed's lock, so it's generated once instead of once each. Other
+# seeds and cache hits don't wait for it. _cache_lock only guards _seed_locks, for as
+# long as it takes to look a lock up.
+_cache_lock = threading.Lock()
+_seed_locks = {}
+
+
+@lru_cache(maxsize=256)
+def _cached_puzzle(seed, size, difficulty):
+    board, solution = generate_puzzle(size, band=difficulty, seed=seed)
+    # Tuples, so no caller can change the cached copy
+    return tuple(map(tuple, board)), tuple(map(tuple, solution))
+
+
+"""
+Gets the puzzle for a seed, e.g. a daily puzzle served to many players. Puzzles are
+generated with generate_puzzle's band and seed arguments, and the 256 most recently
+used are kept, so asking for the same puzzle again never regenerates it
+
+Parameters:
+seed is the seed (any hashable value random.Random accepts, e.g. an int or "2024-05-01")
+size is the number of rows/columns of the board (a perfect square, 9 for the game)
+difficulty is the DifficultyLevel the puzzle is graded in
+
+Return: tuple of (board, solution), both new 2D Python lists
+"""
+
+
+def seeded_puzzle(seed, size, difficulty):
+    key = (seed, size, difficulty)
+    with _cache_lock:
+        seed_lock = _seed_locks.setdefault(key, threading.Lock())
+
+    with seed_lock:
+        board, solution = _cached_puzzle(seed, size, difficulty)
+
+    with _cache_lock:
+        # Callers still waiting hold the old lock, and anyone arriving later finds
+        # the puzzle cached
+        _seed_locks.pop(key, None)
+    return [list(row) for row in board], [list(row) for row in solution]
+
+
+def benchmark(sizes=(4, 9, 16, 25), rounds=20):
+    """
+    Print how long filling a full board takes as the board size grows.
+
+    Parameters:
+    sizes - the board sizes to time
+    rounds - the number of boards to fill per size
+
+    Return: None
+    """
+    import time
+
+    for size in sizes:
+        times = []
+        for _ in range(rounds):
+            sudoku = SudokuGenerator(size, 0)
+            start = time.perf_counter()
+            sudoku.fill_values()
+            times.append(time.perf_counter() - start)
+
+        times.sort()
+        print(
+            f"{size}x{size}: median {times[len(times) // 2] * 1000:9.2f} ms"
+            f"  max {times[-1] * 1000:9.2f} ms  ({rounds} boards)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,206 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from multiprocessing import Pool
+
+from board_state import BoardState
+from difficulty import DifficultyLevel
+from hints import HintEngine
+from puzzle_io import format_record, parse_record, positive_int, read_chunks
+
+"""
+    Grades puzzles by how hard they are for a person to solve
+
+    A puzzle is solved step by step with the hint engine's techniques. Its grade is
+    the hardest technique it needed and the number of steps taken; puzzles the
+    techniques can't finish need guessing, the hardest grade. Run as a script to grade
+    a puzzle set written by batch_generate.py across a process pool.
+
+    Example:
+    python grader.py puzzles.txt -o graded.txt --workers 8
+"""
+
+# The techniques in order of difficulty. "Guess" means none of the others applied.
+TECHNIQUES = (
+    "Naked single",
+    "Hidden single",
+    "Naked pair",
+    "Pointing",
+    "X-wing",
+    "Guess",
+)
+RANKS = {technique: rank for rank, technique in enumerate(TECHNIQUES)}
+
+# Lowest rank of the hardest technique needed for each difficulty
+BANDS = (
+    (RANKS["X-wing"], DifficultyLevel.HARD),
+    (RANKS["Hidden single"], DifficultyLevel.MEDIUM),
+    (RANKS["Naked single"], DifficultyLevel.EASY),
+)
+
+# score - 100 * the hardest technique's rank + steps, so puzzles sort by difficulty
+# technique - name of the hardest technique needed
+# steps - the number of steps (placements and candidate eliminations) taken
+Grade = namedtuple("Grade", ["score", "technique", "steps"])
+
+
+def grade(board):
+    """
+    Grade a puzzle by solving it with the hint engine's techniques.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells (the format generate_sudoku returns)
+
+    Return: Grade
+    """
+    state = BoardState(board)
+    engine = HintEngine(state)
+    hardest = 0
+    steps = 0
+
+    while not state.is_full():
+        hint = engine.next_hint()
+        if hint is None:
+            # Every cell left counts as a step, as each needs a guess or a technique
+            # harder than the engine knows
+            hardest = RANKS["Guess"]
+            steps += state.empty
+            break
+
+        hardest = max(hardest, RANKS[hint.technique])
+        steps += 1
+        if hint.placement is not None:
+            state.set_value(*hint.placement)
+
+    return Grade(100 * hardest + steps, TECHNIQUES[hardest], steps)
+
+
+def grade_level(result):
+    """
+    Get the difficulty a grade falls into: EASY needs naked singles only, MEDIUM
+    hidden singles, pairs or pointing, and HARD an X-wing or guessing.
+
+    Parameters:
+    result - the Grade
+
+    Return: DifficultyLevel
+    """
+    rank = RANKS[result.technique]
+    for lowest, level in BANDS:
+        if rank >= lowest:
+            return level
+
+
+def grade_chunk(lines):
+    """
+    Grade one chunk of a puzzle set. Runs inside a worker process.
+
+    Parameters:
+    lines - list of lines written by format_record
+
+    Return:
+    tuple of (worker pid, list of (line relabelled with its graded difficulty, Grade),
+    seconds spent grading)
+    """
+    start = time.perf_counter()
+    results = []
+    for line in lines:
+        board, solution, _ = parse_record(line)
+        result = grade(board)
+        results.append((format_record(board, solution, grade_level(result)), result))
+    return os.getpid(), results, time.perf_counter() - start
+
+
+def report(done, elapsed, techniques, levels, worker_stats, out=sys.stderr):
+    """
+    Print the throughput and how the puzzles graded so far are spread over the
+    techniques and difficulties.
+
+    Parameters:
+    done - puzzles graded so far
+    elapsed - wall clock seconds since the pool started
+    techniques - Counter of the hardest technique per puzzle
+    levels - Counter of the graded difficulty per puzzle
+    worker_stats - dict of worker pid to [puzzles, busy seconds]
+
+    Return: None
+    """
+    rates = "  ".join(
+        f"{pid}:{puzzles / busy:.1f}/s"
+        for pid, (puzzles, busy) in sorted(worker_stats.items())
+        if busy > 0
+    )
+    print(f"{done} puzzles  {done / elapsed:.1f} puzzles/s  workers {rates}", file=out)
+    for technique in TECHNIQUES:
+        if techniques[technique]:
+            print(f"  {technique:<14} {techniques[technique]:8}", file=out)
+    for level in DifficultyLevel:
+        print(f"  {level.name:<14} {levels[level]:8}", file=out)
+
+
+def run(args):
+    """
+    Grade the puzzle set described by the parsed command line arguments.
+
+    Return: None
+    """
+    techniques = Counter()
+    levels = Counter()
+    worker_stats = {}
+    done = 0
+    start = time.perf_counter()
+
+    out = open(args.output, "w") if args.output else None
+    try:
+        with open(args.source) as source, Pool(args.workers) as pool:
+            # imap keeps the output in the same order as the input
+            chunks = read_chunks(source, args.chunk_size)
+            for pid, results, busy in pool.imap(grade_chunk, chunks):
+                for line, result in results:
+                    techniques[result.technique] += 1
+                    levels[grade_level(result)] += 1
+                    if out is not None:
+                        out.write(line)
+
+                stats = worker_stats.setdefault(pid, [0, 0.0])
+                stats[0] += len(results)
+                stats[1] += busy
+                done += len(results)
+    finally:
+        if out is not None:
+            out.close()
+
+    report(done, time.perf_counter() - start, techniques, levels, worker_stats)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Grade a puzzle set by the techniques needed to solve it."
+    )
+    parser.add_argument("source", help="puzzle set written by batch_generate.py")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="file to write the puzzles to, relabelled with their graded difficulty",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=positive_int,
+        default=200,
+        help="puzzles per unit of work",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
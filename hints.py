@@ -0,0 +1,272 @@
+from array import array
+from collections import namedtuple
+
+from board_state import unit_cells
+
+"""
+    Finds the next logical step on a board being played, like a person would
+
+    Candidates come from the BoardState, which keeps them up to date on every move, so
+    a hint only has to look for a pattern. The techniques are tried easiest first:
+    naked single, hidden single, naked pair, pointing pair/triple and X-wing. Steps
+    that remove candidates are remembered, so the next hint builds on them.
+"""
+
+# technique - name of the technique used
+# cells - indexes of the cells the step is based on (to highlight)
+# placement - (index, num) of the number the step places, or None
+# eliminations - tuple of (index, mask) of the candidates the step removes
+Hint = namedtuple("Hint", ["technique", "cells", "placement", "eliminations"])
+
+
+def _single_bit(mask):
+    return mask != 0 and mask & (mask - 1) == 0
+
+
+def _two_bits(mask):
+    rest = mask & (mask - 1)
+    return rest != 0 and rest & (rest - 1) == 0
+
+
+def _once(masks):
+    """
+    Get the bits set in exactly one of masks.
+
+    Parameters:
+    masks - iterable of ints
+
+    Return: int
+    """
+    once = twice = 0
+    for mask in masks:
+        twice |= once & mask
+        once |= mask
+    return once & ~twice
+
+
+class HintEngine:
+    def __init__(self, state):
+        """
+        Set up hints for a board.
+
+        Parameters:
+        state - the BoardState of the board
+
+        Return: None
+        """
+        self.state = state
+        area = state.size * state.size
+        # Candidates removed by earlier hints, per cell
+        self.eliminated = array("I", [0]) * area
+        # The numbers on the board when the last hint was given
+        self.seen = bytes(state.values)
+
+    def sync(self):
+        """
+        Forget the removed candidates if a number was taken off the board (erase, undo
+        or reset) since the last hint, as they may have depended on it.
+
+        Parameters: None
+        Return: None
+        """
+        values = self.state.values
+        if any(old and old != new for old, new in zip(self.seen, values)):
+            self.eliminated = array("I", [0]) * len(values)
+        self.seen = bytes(values)
+
+    def candidates(self):
+        """
+        Get the candidates of every cell, minus those removed by earlier hints.
+
+        Parameters: None
+        Return:
+        list indexed by cell of candidate masks (bit n for number n)
+        """
+        self.sync()
+        return [
+            mask & ~removed
+            for mask, removed in zip(self.state.candidates, self.eliminated)
+        ]
+
+    def next_hint(self):
+        """
+        Find the next step. A wrong number on the board is pointed out first, as no
+        deduction can be trusted until it's fixed.
+
+        Parameters: None
+        Return:
+        Hint, or None if none of the techniques applies
+        """
+        candidates = self.candidates()
+
+        index = self.state.invalid.find(1)
+        if index != -1:
+            return Hint("Wrong number", (index,), None, ())
+
+        for technique in (
+            self.naked_single,
+            self.hidden_single,
+            self.naked_pair,
+            self.pointing,
+            self.x_wing,
+        ):
+            hint = technique(candidates)
+            if hint is not None:
+                for index, mask in hint.eliminations:
+                    self.eliminated[index] |= mask
+                return hint
+        return None
+
+    def naked_single(self, candidates):
+        """
+        Find a cell with a single candidate left.
+
+        Parameters:
+        candidates - candidate masks of every cell, as returned by candidates()
+
+        Return: Hint, or None if the technique doesn't apply
+        """
+        for index, mask in enumerate(candidates):
+            if _single_bit(mask):
+                return Hint(
+                    "Naked single", (index,), (index, mask.bit_length() - 1), ()
+                )
+        return None
+
+    def hidden_single(self, candidates):
+        """
+        Find a number that only fits one cell of a unit.
+
+        Parameters:
+        candidates - candidate masks of every cell, as returned by candidates()
+
+        Return: Hint, or None if the technique doesn't apply
+        """
+        for cells in unit_cells(self.state.size):
+            single = _once(candidates[index] for index in cells)
+            if not single:
+                continue
+            bit = single & -single
+            for index in cells:
+                if candidates[index] & bit:
+                    return Hint(
+                        "Hidden single", (index,), (index, bit.bit_length() - 1), ()
+                    )
+        return None
+
+    def naked_pair(self, candidates):
+        """
+        Find two cells of a unit with the same two candidates, which then can't go
+        anywhere else in the unit.
+
+        Parameters:
+        candidates - candidate masks of every cell, as returned by candidates()
+
+        Return: Hint, or None if the technique doesn't apply
+        """
+        for cells in unit_cells(self.state.size):
+            pairs = {}
+            for index in cells:
+                mask = candidates[index]
+                if not _two_bits(mask):
+                    continue
+                other = pairs.setdefault(mask, index)
+                if other == index:
+                    continue
+                eliminations = tuple(
+                    (cell, candidates[cell] & mask)
+                    for cell in cells
+                    if cell not in (index, other) and candidates[cell] & mask
+                )
+                if eliminations:
+                    return Hint("Naked pair", (other, index), None, eliminations)
+        return None
+
+    def pointing(self, candidates):
+        """
+        Find a number whose candidates in a box all lie on one row or column, which
+        then can't go anywhere else on that line.
+
+        Parameters:
+        candidates - candidate masks of every cell, as returned by candidates()
+
+        Return: Hint, or None if the technique doesn't apply
+        """
+        size = self.state.size
+        box_length = self.state.box_length
+        units = unit_cells(size)
+
+        for box in range(size):
+            cells = units[2 * size + box]
+            rows = [cells[i : i + box_length] for i in range(0, size, box_length)]
+            cols = [cells[i::box_length] for i in range(box_length)]
+
+            for segments, line in (
+                (rows, lambda i: i // size),
+                (cols, lambda i: size + i % size),
+            ):
+                masks = [0] * box_length
+                for k, segment in enumerate(segments):
+                    for index in segment:
+                        masks[k] |= candidates[index]
+
+                unique = _once(masks)
+                while unique:
+                    bit = unique & -unique
+                    unique ^= bit
+                    segment = next(s for s, m in zip(segments, masks) if m & bit)
+                    eliminations = tuple(
+                        (index, bit)
+                        for index in units[line(segment[0])]
+                        if index not in segment and candidates[index] & bit
+                    )
+                    if eliminations:
+                        return Hint(
+                            "Pointing",
+                            tuple(i for i in segment if candidates[i] & bit),
+                            None,
+                            eliminations,
+                        )
+        return None
+
+    def x_wing(self, candidates):
+        """
+        Find a number with exactly two candidates in each of two rows, in the same two
+        columns (or the other way around). It then can't go anywhere else in those
+        columns.
+
+        Parameters:
+        candidates - candidate masks of every cell, as returned by candidates()
+
+        Return: Hint, or None if the technique doesn't apply
+        """
+        size = self.state.size
+        units = unit_cells(size)
+        rows, cols = units[:size], units[size : 2 * size]
+
+        for num in range(1, size + 1):
+            bit = 1 << num
+            for lines, crossing in ((rows, cols), (cols, rows)):
+                seen = {}
+                for line, cells in enumerate(lines):
+                    positions = 0
+                    for k, index in enumerate(cells):
+                        if candidates[index] & bit:
+                            positions |= 1 << k
+                    if not _two_bits(positions):
+                        continue
+                    other = seen.setdefault(positions, line)
+                    if other == line:
+                        continue
+
+                    ks = [k for k in range(size) if positions >> k & 1]
+                    corners = tuple(lines[i][k] for i in (other, line) for k in ks)
+                    eliminations = tuple(
+                        (index, bit)
+                        for k in ks
+                        for index in crossing[k]
+                        if index not in corners and candidates[index] & bit
+                    )
+                    if eliminations:
+                        return Hint("X-wing", corners, None, eliminations)
+        return None
@@ -0,0 +1,103 @@
+import struct
+from collections import deque
+
+"""
+    Undo/redo history of the moves made on a board
+
+    Every move (sketching, placing or erasing a number, or toggling a pencil mark)
+    changes a single cell, so it's stored as one 16 byte record: the cell's index and
+    its (value, sketch, invalid, marks) fields before and after the move. Placing a
+    number also removes it from its peers' pencil marks; which peers lost a mark is
+    appended to the record as a little endian bit mask (usually 0 to 3 bytes).
+"""
+
+# cell index, then value/sketch/invalid/marks before and after
+MOVE = struct.Struct("<HBBBIBBBI")
+
+
+class Journal:
+    def __init__(self, max_moves=10000):
+        """
+        Set up an empty history.
+
+        Parameters:
+        max_moves - the most moves that can be undone; older moves are dropped
+
+        Return: None
+        """
+        self.done = deque(maxlen=max_moves)
+        self.undone = []
+
+    def __len__(self):
+        return len(self.done)
+
+    def record(self, index, before, after, cleared=0):
+        """
+        Add a move to the history. Moves that were undone can't be redone after this.
+
+        Parameters:
+        index - buffer index of the cell the move changed
+        before - the cell's (value, sketch, invalid, marks) fields before the move
+        after - the cell's fields after the move
+        cleared - mask of the peers whose pencil mark the move removed (from
+        BoardState.set_value)
+
+        Return: None
+        """
+        self.done.append(
+            MOVE.pack(index, *before, *after)
+            + cleared.to_bytes((cleared.bit_length() + 7) // 8, "little")
+        )
+        self.undone.clear()
+
+    def undo(self):
+        """
+        Take the last move off the history.
+
+        Parameters: None
+        Return:
+        (index, before, after, cleared) of the move, or None if there is nothing to undo
+        """
+        if not self.done:
+            return None
+        move = self.done.pop()
+        self.undone.append(move)
+        return self.unpack(move)
+
+    def redo(self):
+        """
+        Put the last undone move back on the history.
+
+        Parameters: None
+        Return:
+        (index, before, after, cleared) of the move, or None if there is nothing to redo
+        """
+        if not self.undone:
+            return None
+        move = self.undone.pop()
+        self.done.append(move)
+        return self.unpack(move)
+
+    def clear(self):
+        """
+        Forget every move.
+
+        Parameters: None
+        Return: None
+        """
+        self.done.clear()
+        self.undone.clear()
+
+    @staticmethod
+    def unpack(move):
+        """
+        Decode a stored move.
+
+        Parameters:
+        move - bytes packed with MOVE
+
+        Return: (index, before, after, cleared)
+        """
+        index, *fields = MOVE.unpack_from(move)
+        cleared = int.from_bytes(move[MOVE.size :], "little")
+        return index, tuple(fields[:4]), tuple(fields[4:]), cleared
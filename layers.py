@@ -0,0 +1,94 @@
+from functools import lru_cache
+
+import pygame
+
+"""
+    Pre-rendered layers for the parts of a frame that only change when the window is
+    resized: the scaled backgrounds and the board's grid lines
+"""
+
+GRID_COLOR = (30, 30, 30)
+
+
+class ScaledBackground:
+    def __init__(self, image, fill="white"):
+        """
+        Wrap a background image that is drawn stretched over the whole window.
+
+        Parameters:
+        image - the unscaled pygame surface
+        fill - color shown behind the image (e.g. through transparent pixels)
+
+        Return: None
+        """
+        self.image = image
+        self.fill = fill
+        self.surface = None
+
+    def get(self, size):
+        """
+        Get the background scaled to size, scaling it only if size changed since the
+        last call.
+
+        Parameters:
+        size - (width, height) of the window
+
+        Return: pygame.Surface
+        """
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+            self.surface.fill(self.fill)
+            self.surface.blit(pygame.transform.scale(self.image, size), (0, 0))
+        return self.surface
+
+    def draw(self, screen):
+        """
+        Draw the background over the whole screen.
+
+        Parameters:
+        screen - the pygame surface to draw on
+
+        Return: None
+        """
+        screen.blit(self.get(screen.get_size()), (0, 0))
+
+
+@lru_cache(maxsize=8)
+def grid_surface(rows, cols, box_length, cell_size):
+    """
+    Render the lines separating the cells of a board onto a transparent surface. Lines
+    between boxes are drawn thicker.
+
+    Parameters:
+    rows and cols are the number of rows/columns of the board
+    box_length is the number of rows/columns in each box
+    cell_size is the width/height of a cell in pixels
+
+    Return:
+    pygame.Surface to blit at the board's top left corner
+    """
+    width = cols * cell_size
+    height = rows * cell_size
+    surface = pygame.Surface((int(width) + 1, int(height) + 1), pygame.SRCALPHA)
+
+    # draws row separating lines
+    for i in range(1, rows):
+        pygame.draw.line(
+            surface,
+            GRID_COLOR,
+            (0, i * cell_size),
+            (width, i * cell_size),
+            2 + (i % box_length == 0) * 2,
+        )
+
+    # draws column separating lines
+    for i in range(1, cols):
+        pygame.draw.line(
+            surface,
+            GRID_COLOR,
+            (i * cell_size, 0),
+            (i * cell_size, height),
+            2 + (i % box_length == 0) * 2,
+        )
+
+    return surface
@@ -0,0 +1,198 @@
+import os
+import subprocess
+import sys
+import threading
+from collections import deque
+
+from difficulty import DifficultyLevel
+from generator import generate_puzzle
+from puzzle_io import format_record, parse_record
+
+"""
+    Background producer that keeps a few puzzles ready for every difficulty, so starting
+    or restarting a game never has to wait for a puzzle to be generated
+
+    Puzzles are generated in a worker process, so generating a HARD puzzle (up to a few
+    hundred ms) never competes with the game loop for the GIL. The worker is this module
+    run as a script: it reads difficulty names from stdin and answers each with one
+    puzzle set line (see puzzle_io.format_record). It only imports generator.py, so it
+    never loads pygame or opens a window. A daemon thread in the game feeds it requests
+    and queues the puzzles; it spends its time blocked on the pipe, which releases the
+    GIL.
+"""
+
+
+class PuzzlePrefetcher:
+    def __init__(self, size, levels, depth=3):
+        """
+        Set up an empty queue for every difficulty. Nothing is generated until start().
+
+        Parameters:
+        size - the number of rows/columns of the boards to generate
+        levels - the DifficultyLevels to keep puzzles ready for
+        depth - the most ready puzzles to keep per difficulty
+
+        Return: None
+        """
+        self.size = size
+        self.depth = depth
+        self.queues = {level: deque() for level in levels}
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.process = None
+        # The difficulty get() is waiting for, generated next whatever the queues hold
+        self.wanted = None
+
+    def start(self):
+        """
+        Start the worker process and the daemon thread that fills the queues from it.
+
+        Parameters: None
+        Return: None
+        """
+        if self.running or not self.queues:
+            return
+
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(self.size)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.running = True
+        self.thread = threading.Thread(
+            target=self.run, name="puzzle-prefetcher", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the producer thread, wait for it to collect its current puzzle and shut the
+        worker process down.
+
+        Parameters: None
+        Return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        if self.process is not None:
+            # The worker exits once its stdin is closed
+            self.process.stdin.close()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+    def get(self, level):
+        """
+        Take a ready puzzle. If the queue for level is empty, wait for the worker to
+        make one; only without a worker is the puzzle generated in this process.
+
+        Parameters:
+        level - the DifficultyLevel of the puzzle
+
+        Return:
+        tuple of (board, solution)
+        """
+        with self.condition:
+            queue = self.queues.get(level)
+            if queue is not None and not queue and self.running:
+                self.wanted = level
+                self.condition.notify_all()
+                while not queue and self.running:
+                    self.condition.wait()
+
+            if queue:
+                puzzle = queue.popleft()
+                # Wake the producer to replace the puzzle that was just taken
+                self.condition.notify_all()
+                return puzzle
+
+        return generate_puzzle(self.size, band=level)
+
+    def ready(self, level):
+        """
+        Get the number of puzzles waiting for a difficulty.
+
+        Parameters:
+        level - the DifficultyLevel to check
+
+        Return: int
+        """
+        with self.condition:
+            return len(self.queues.get(level, ()))
+
+    def run(self):
+        """
+        Producer loop: ask the worker for the difficulty get() is waiting for, or else
+        for the emptiest queue, sleeping while every queue is full.
+
+        Parameters: None
+        Return: None
+        """
+        while True:
+            with self.condition:
+                while (
+                    self.running
+                    and self.wanted is None
+                    and all(len(queue) >= self.depth for queue in self.queues.values())
+                ):
+                    self.condition.wait()
+                if not self.running:
+                    return
+
+                if self.wanted is not None:
+                    level, self.wanted = self.wanted, None
+                else:
+                    level = min(self.queues, key=lambda level: len(self.queues[level]))
+
+            # Waited on outside the lock so get() never blocks on the worker
+            try:
+                self.process.stdin.write(level.name + "\n")
+                self.process.stdin.flush()
+                line = self.process.stdout.readline()
+            except OSError:
+                line = ""
+
+            with self.condition:
+                if not line:
+                    # The worker died; get() generates puzzles itself from now on
+                    self.running = False
+                    self.condition.notify_all()
+                    return
+
+                board, solution, _ = parse_record(line)
+                self.queues[level].append((board, solution))
+                self.condition.notify_all()
+
+
+def serve(size, requests=sys.stdin, replies=sys.stdout):
+    """
+    Worker loop: answer every difficulty name read from requests with a puzzle.
+
+    Parameters:
+    size - the number of rows/columns of the boards to generate
+    requests - file to read DifficultyLevel names from, one per line
+    replies - file to write the puzzles to, one format_record line per request
+
+    Return: None
+    """
+    for line in requests:
+        level = DifficultyLevel[line.strip()]
+        board, solution = generate_puzzle(size, band=level)
+        replies.write(format_record(board, solution, level))
+        replies.flush()
+
+
+if __name__ == "__main__":
+    try:
+        serve(int(sys.argv[1]))
+    except (KeyboardInterrupt, BrokenPipeError):
+        # The game was interrupted or closed while a puzzle was being made
+        pass
@@ -0,0 +1,295 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+
+from difficulty import DifficultyLevel
+from puzzle_io import parse_record, read_chunks
+
+"""
+    Compact binary puzzle bank that is read through mmap
+
+    Layout (little endian):
+    header - magic b"SDKB", format version, board size, record size, number of levels
+    index  - one (DifficultyLevel value, first record offset, record count) entry per level
+    records - fixed size records grouped by level, each holding the puzzle followed by its
+              solution, two cells per byte (high nibble first)
+
+    Opening a bank only reads the header and index, and a puzzle is found by offset, so
+    even banks with millions of puzzles open instantly and only the pages that are
+    actually read become resident.
+"""
+
+MAGIC = b"SDKB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHH")
+INDEX_ENTRY = struct.Struct("<HQQ")
+
+
+def record_size(size):
+    """
+    Calculate the number of bytes used by one puzzle + solution record.
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return: int
+    """
+    return (2 * size * size + 1) // 2
+
+
+def pack_record(board, solution):
+    """
+    Pack a puzzle and its solution into one record.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+    solution - the solved 2D list
+
+    Return: bytes
+    """
+    cells = [num for grid in (board, solution) for row in grid for num in row]
+    if len(cells) % 2:
+        cells.append(0)
+    return bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2))
+
+
+def unpack_record(record, size):
+    """
+    Unpack a record made by pack_record.
+
+    Parameters:
+    record - the record's bytes
+    size - the number of rows/columns of the board
+
+    Return:
+    tuple of (board, solution), both 2D lists
+    """
+    cells = []
+    for byte in record:
+        cells.append(byte >> 4)
+        cells.append(byte & 0xF)
+
+    area = size * size
+    board = [cells[row * size : (row + 1) * size] for row in range(size)]
+    solution = [
+        cells[area + row * size : area + (row + 1) * size] for row in range(size)
+    ]
+    return board, solution
+
+
+def check_grid(grid, size):
+    """
+    Check that a board or solution is size x size with no digit above size, as a
+    record of the wrong size would read back as a different, garbled board.
+
+    Parameters:
+    grid - 2D list of ints, 0 for empty cells
+    size - the number of rows/columns the bank stores
+
+    Return: None
+
+    Raises:
+    ValueError if the grid doesn't fit
+    """
+    if len(grid) != size or any(len(row) != size for row in grid):
+        raise ValueError(f"not a {size}x{size} board (see --size)")
+    if any(not 0 <= num <= size for row in grid for num in row):
+        raise ValueError(f"digit out of range for a {size}x{size} board")
+
+
+def write_bank(path, puzzles_by_level, size=9):
+    """
+    Write a puzzle bank. Puzzles are streamed to disk one at a time, so the iterables can
+    be generators over puzzle sets that don't fit in memory.
+
+    Parameters:
+    path - the file to write
+    puzzles_by_level - dict of DifficultyLevel to an iterable of (board, solution)
+    size - the number of rows/columns of every board
+
+    Return:
+    dict of DifficultyLevel to the number of puzzles written
+
+    Raises:
+    ValueError if a board or solution isn't size x size; no bank is left behind
+    """
+    if size > 15:
+        raise ValueError(
+            "the bank stores one cell per nibble, so boards must be 9x9 or smaller"
+        )
+
+    levels = list(DifficultyLevel)
+    rsize = record_size(size)
+    data_start = HEADER.size + INDEX_ENTRY.size * len(levels)
+    counts = {}
+
+    try:
+        with open(path, "wb") as f:
+            # Reserve the header, then fill it in once the record counts are known
+            f.write(bytes(data_start))
+
+            for level in levels:
+                count = 0
+                for board, solution in puzzles_by_level.get(level, ()):
+                    try:
+                        check_grid(board, size)
+                        check_grid(solution, size)
+                    except ValueError as e:
+                        raise ValueError(
+                            f"{level.name} puzzle {count + 1}: {e}"
+                        ) from None
+                    f.write(pack_record(board, solution))
+                    count += 1
+                counts[level] = count
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, size, rsize, len(levels)))
+            offset = data_start
+            for level in levels:
+                f.write(INDEX_ENTRY.pack(level.value, offset, counts[level]))
+                offset += counts[level] * rsize
+    except BaseException:
+        # A half written bank would be opened as a valid one
+        os.remove(path)
+        raise
+
+    return counts
+
+
+class PuzzleBank:
+    def __init__(self, path):
+        """
+        Open a puzzle bank. Only the header and index are read.
+
+        Parameters:
+        path - the bank file written by write_bank
+
+        Return: None
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, self.record_size, level_count = HEADER.unpack_from(
+            self.data
+        )
+        if magic != MAGIC or version != VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle bank")
+
+        # DifficultyLevel value -> (offset of the first record, number of records)
+        self.ranges = {}
+        for i in range(level_count):
+            value, offset, count = INDEX_ENTRY.unpack_from(
+                self.data, HEADER.size + i * INDEX_ENTRY.size
+            )
+            self.ranges[value] = (offset, count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return sum(count for _, count in self.ranges.values())
+
+    def close(self):
+        """
+        Unmap the bank file.
+
+        Parameters: None
+        Return: None
+        """
+        self.data.close()
+
+    def count(self, level):
+        """
+        Get the number of puzzles stored for a difficulty.
+
+        Parameters:
+        level - the DifficultyLevel to look up
+
+        Return: int
+        """
+        return self.ranges.get(level.value, (0, 0))[1]
+
+    def get(self, level, index):
+        """
+        Read one puzzle of a difficulty.
+
+        Parameters:
+        level - the DifficultyLevel to read from
+        index - the puzzle's position within that difficulty
+
+        Return:
+        tuple of (board, solution), both 2D lists
+        """
+        offset, count = self.ranges.get(level.value, (0, 0))
+        if not 0 <= index < count:
+            raise IndexError(f"{level.name} has {count} puzzles, no puzzle {index}")
+
+        start = offset + index * self.record_size
+        return unpack_record(self.data[start : start + self.record_size], self.size)
+
+    def random_puzzle(self, level, rng=random):
+        """
+        Read a random puzzle of a difficulty.
+
+        Parameters:
+        level - the DifficultyLevel to pick from
+        rng - the random number generator to use
+
+        Return:
+        tuple of (board, solution), both 2D lists
+        """
+        return self.get(level, rng.randrange(self.count(level)))
+
+
+def read_puzzle_set(path, level):
+    """
+    Stream the puzzles of one difficulty out of a file written by batch_generate.py.
+
+    Parameters:
+    path - the puzzle set file
+    level - the DifficultyLevel to keep
+
+    Return: generator of (board, solution)
+    """
+    with open(path) as f:
+        for chunk in read_chunks(f, 1000):
+            for line in chunk:
+                board, solution, level_name = parse_record(line)
+                if level_name == level.name:
+                    yield board, solution
+
+
+def build(source, destination, size=9):
+    """
+    Convert a puzzle set written by batch_generate.py into a bank. The source is read
+    once per difficulty so memory use doesn't grow with its size.
+
+    Return: None
+    """
+    counts = write_bank(
+        destination,
+        {level: read_puzzle_set(source, level) for level in DifficultyLevel},
+        size,
+    )
+    for level, count in counts.items():
+        print(f"{level.name}: {count} puzzles")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a puzzle bank from a batch_generate.py puzzle set."
+    )
+    parser.add_argument("source", help="puzzle set written by batch_generate.py")
+    parser.add_argument("destination", help="bank file to write")
+    parser.add_argument("--size", type=int, default=9, help="rows/columns per board")
+    args = parser.parse_args()
+    try:
+        build(args.source, args.destination, args.size)
+    except ValueError as e:
+        parser.error(str(e))
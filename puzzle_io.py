@@ -0,0 +1,122 @@
+import argparse
+from math import isqrt
+
+"""
+    Reading and writing boards as single lines of text
+
+    A board is written row by row as one character per cell, with '.' for empty cells and
+    1-9 then A-P for the digits (so boards up to 25x25 fit). A 9x9 board is the standard
+    81 character line used by most puzzle collections.
+"""
+
+DIGITS = ".123456789ABCDEFGHIJKLMNOP"
+CHAR_VALUES = {char: value for value, char in enumerate(DIGITS)}
+CHAR_VALUES["0"] = 0
+
+
+def board_to_line(board):
+    """
+    Convert a board to its one line form.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+
+    Return: str
+    """
+    return "".join(DIGITS[num] for row in board for num in row)
+
+
+def line_to_board(line):
+    """
+    Convert a one line board back into a 2D list. Both '.' and '0' are read as empty.
+
+    Parameters:
+    line - the board's characters, without surrounding whitespace
+
+    Return:
+    2D list of ints, 0 for empty cells
+
+    Raises:
+    ValueError if the line is not a square board of valid characters
+    """
+    size = isqrt(len(line))
+    box_length = isqrt(size)
+    if size * size != len(line) or box_length * box_length != size or size == 0:
+        raise ValueError(f"a board line can't have {len(line)} characters")
+
+    try:
+        values = [CHAR_VALUES[char] for char in line.upper()]
+    except KeyError as e:
+        raise ValueError(f"invalid board character {e.args[0]!r}") from None
+
+    if max(values) > size:
+        raise ValueError(f"digit out of range for a {size}x{size} board")
+
+    return [values[row * size : (row + 1) * size] for row in range(size)]
+
+
+def format_record(board, solution, level):
+    """
+    Format a puzzle, its solution and its difficulty as one line of a puzzle set.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+    solution - the solved 2D list
+    level - the DifficultyLevel the puzzle was generated for
+
+    Return: str ending in a newline
+    """
+    return f"{board_to_line(board)} {board_to_line(solution)} {level.name}\n"
+
+
+def parse_record(line):
+    """
+    Parse a line written by format_record.
+
+    Parameters:
+    line - one line of a puzzle set
+
+    Return:
+    tuple of (board, solution, level name)
+    """
+    board, solution, level = line.split()
+    return line_to_board(board), line_to_board(solution), level
+
+
+def read_chunks(f, chunk_size):
+    """
+    Stream the lines of a puzzle set in chunks, so a set of any size can be handed to a
+    process pool without reading it all into memory. Blank lines and lines starting
+    with '#' (comments) are skipped.
+
+    Parameters:
+    f - the open puzzle set, or any iterable of lines
+    chunk_size - the most lines per chunk
+
+    Return: generator of lists of lines
+    """
+    chunk = []
+    for line in f:
+        if not line.strip() or line.startswith("#"):
+            continue
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def positive_int(text):
+    """
+    argparse type for counts that must be at least 1.
+
+    Parameters:
+    text - the argument as given on the command line
+
+    Return: int
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+import pygame
+
+"""
+    Cache of rendered text surfaces, so steady-state frames don't rasterize any text
+"""
+
+
+class TextCache:
+    def __init__(self, max_size=512):
+        """
+        Set up an empty cache.
+
+        Parameters:
+        max_size - the most surfaces to keep; the least recently used is evicted first
+
+        Return: None
+        """
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def get(self, key, make):
+        """
+        Look up a surface, creating it with make() on a miss.
+
+        Parameters:
+        key - hashable description of the surface
+        make - function returning the surface for key
+
+        Return: pygame.Surface
+        """
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = make()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def render(self, font, text, color):
+        """
+        Get antialiased text as rendered by font.render.
+
+        Parameters:
+        font - the pygame font to render with
+        text - the string to render
+        color - the text color
+
+        Return: pygame.Surface
+        """
+        return self.get((text, font, color), lambda: font.render(text, True, color))
+
+    def render_outlined(self, font, text, color, outline_color, thickness=2):
+        """
+        Get text with an outline, composited into one surface. The text itself sits
+        thickness pixels in from the top left corner, so blit the surface at
+        (x - thickness, y - thickness) to place the text at (x, y).
+
+        Parameters:
+        font - the pygame font to render with
+        text - the string to render
+        color - the text color
+        outline_color - the outline color
+        thickness - how far the outline reaches past the text, in pixels
+
+        Return: pygame.Surface
+        """
+
+        def make():
+            outline = self.render(font, text, outline_color)
+            width, height = outline.get_size()
+            surface = pygame.Surface(
+                (width + 2 * thickness, height + 2 * thickness), pygame.SRCALPHA
+            )
+            for x in (0, 2 * thickness):
+                for y in (0, 2 * thickness):
+                    surface.blit(outline, (x, y))
+            surface.blit(self.render(font, text, color), (thickness, thickness))
+            return surface
+
+        return self.get(("outlined", text, font, color, outline_color, thickness), make)
+
+    def clear(self):
+        """
+        Drop every cached surface, e.g. after the fonts change.
+
+        Parameters: None
+        Return: None
+        """
+        self.surfaces.clear()
+
+
+# Shared by every screen so the same text is only ever rendered once
+text_cache = TextCache()
@@ -0,0 +1,289 @@
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import namedtuple
+from math import isqrt
+
+from board_state import BoardState
+from difficulty import DifficultyLevel
+from puzzle_io import DIGITS
+
+"""
+    Compact binary snapshots of games in progress, so a game can be resumed
+
+    Layout (little endian):
+    header - magic b"SDKS", format version, board size, mistakes, DifficultyLevel value
+    cells  - one byte per cell for each of the givens, values, sketches, invalid flags
+             and solution, then the pencil marks (2 bytes per cell up to 16x16 boards,
+             4 above)
+
+    A 9x9 game is 575 bytes. Snapshots are written and synced to a temporary file that
+    then replaces the old one, so a crash or power loss mid-write never leaves a broken
+    save behind. The game autosaves through a SaveWriter, which does the writing and
+    syncing on a background thread so a slow disk never stalls a frame. Every field is range checked when a save is read, so a corrupt one is
+    reported as unreadable rather than loaded.
+"""
+
+MAGIC = b"SDKS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBB")
+
+# state - the BoardState, ready to hand to a Board
+# solution - the solved 2D list
+# mistakes - the number of wrong placements so far
+# difficulty - the DifficultyLevel the game was started at
+SavedGame = namedtuple("SavedGame", ["state", "solution", "mistakes", "difficulty"])
+
+
+def _mark_typecode(size):
+    # Marks use bits 1 to size, stored shifted down by one
+    return "H" if size <= 16 else "I"
+
+
+def pack_game(state, solution, mistakes, difficulty):
+    """
+    Encode a game in progress.
+
+    Parameters:
+    state - the BoardState of the board being played
+    solution - the solved 2D list
+    mistakes - the number of wrong placements so far
+    difficulty - the DifficultyLevel the game was started at
+
+    Return: bytes
+    """
+    marks = array(_mark_typecode(state.size), (mask >> 1 for mask in state.marks))
+    return b"".join(
+        (
+            HEADER.pack(MAGIC, VERSION, state.size, mistakes, difficulty.value),
+            state.givens,
+            state.values,
+            state.sketches,
+            state.invalid,
+            bytes(num for row in solution for num in row),
+            marks.tobytes(),
+        )
+    )
+
+
+def unpack_game(data):
+    """
+    Decode a game encoded by pack_game.
+
+    Parameters:
+    data - the bytes
+
+    Return: SavedGame
+
+    Raises:
+    ValueError if data isn't a saved game or a field is out of range
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("not a saved game")
+    magic, version, size, mistakes, level = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} saved game")
+    if not 0 < size < len(DIGITS) or isqrt(size) ** 2 != size:
+        raise ValueError(f"saved game has an invalid board size {size}")
+    # Raises ValueError for unknown levels
+    difficulty = DifficultyLevel(level)
+
+    area = size * size
+    marks = array(_mark_typecode(size))
+    if len(data) != HEADER.size + 5 * area + marks.itemsize * area:
+        raise ValueError("saved game is truncated")
+
+    fields = [
+        data[HEADER.size + i * area : HEADER.size + (i + 1) * area] for i in range(5)
+    ]
+    givens, values, sketches, invalid, solution = fields
+    marks.frombytes(data[HEADER.size + 5 * area :])
+
+    if max(max(givens), max(values), max(sketches), max(solution)) > size:
+        raise ValueError("saved game has a digit out of range")
+    if max(invalid) > 1 or max(marks) >> size:
+        raise ValueError("saved game has an invalid flag or pencil mark")
+    if min(solution) == 0:
+        raise ValueError("saved game's solution isn't complete")
+    if any(given and given != num for given, num in zip(givens, solution)):
+        raise ValueError("saved game's givens don't match its solution")
+
+    state = BoardState(
+        [list(givens[row * size : (row + 1) * size]) for row in range(size)]
+    )
+    for index, num in enumerate(values):
+        if not givens[index]:
+            state.set_value(index, num)
+    # Set after the values, as placing them clears marks from their peers
+    state.sketches[:] = sketches
+    state.invalid[:] = invalid
+    state.marks = array("I", (mask << 1 for mask in marks))
+
+    return SavedGame(
+        state,
+        [list(solution[row * size : (row + 1) * size]) for row in range(size)],
+        mistakes,
+        difficulty,
+    )
+
+
+def save_game(path, state, solution, mistakes, difficulty):
+    """
+    Write a game in progress to path, atomically replacing any earlier save.
+
+    Parameters: see pack_game
+    Return: None
+    """
+    write_save(path, pack_game(state, solution, mistakes, difficulty))
+
+
+def write_save(path, data):
+    """
+    Atomically replace the save at path with data from pack_game.
+
+    Parameters:
+    path - the save file
+    data - the bytes to write
+
+    Return: None
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        # The data has to be on disk before the rename is, or a power loss could
+        # leave an empty save in place of the old one
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+    if os.name == "posix":
+        # Sync the directory too, so the rename itself survives a power loss
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def load_game(path):
+    """
+    Read a game written by save_game.
+
+    Parameters:
+    path - the save file
+
+    Return:
+    SavedGame, or None if there is no save or it can't be read
+    """
+    try:
+        with open(path, "rb") as f:
+            return unpack_game(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def delete_game(path):
+    """
+    Remove a save, e.g. once its game is over.
+
+    Parameters:
+    path - the save file
+
+    Return: None
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SaveWriter:
+    def __init__(self):
+        """
+        Set up a writer with nothing pending. Its thread starts with the first save.
+
+        Parameters: None
+        Return: None
+        """
+        # Save file -> the newest snapshot still to write, or None to delete the save.
+        # Older snapshots are dropped as soon as a newer one arrives, so a burst of
+        # saves costs one write.
+        self.pending = {}
+        self.writing = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def save(self, path, state, solution, mistakes, difficulty):
+        """
+        Queue a snapshot of a game in progress. It is packed right away, so the game
+        can keep changing while it's written.
+
+        Parameters:
+        path - the save file
+        see pack_game for the rest
+
+        Return: None
+        """
+        self._queue(path, pack_game(state, solution, mistakes, difficulty))
+
+    def delete(self, path):
+        """
+        Queue removing a save, after any snapshot of it queued earlier is dropped.
+
+        Parameters:
+        path - the save file
+
+        Return: None
+        """
+        self._queue(path, None)
+
+    def flush(self):
+        """
+        Wait until everything queued so far is on disk.
+
+        Parameters: None
+        Return: None
+        """
+        with self.condition:
+            while self.pending or self.writing:
+                self.condition.wait()
+
+    def _queue(self, path, data):
+        with self.condition:
+            self.pending[path] = data
+            self.condition.notify_all()
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="save-writer", daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        """
+        Writer loop: write (or delete) the newest snapshot of each save as they come.
+
+        Parameters: None
+        Return: None
+        """
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                path = next(iter(self.pending))
+                data = self.pending.pop(path)
+                self.writing = True
+
+            try:
+                if data is None:
+                    delete_game(path)
+                else:
+                    write_save(path, data)
+            except OSError as e:
+                # A failed autosave shouldn't end the game; the next one tries again
+                print(f"couldn't save the game to {path}: {e}", file=sys.stderr)
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
@@ -0,0 +1,50 @@
+"""
+    Runs the game's screens (scenes) one after another from a single loop
+
+    A scene is a function that runs until its screen is left and returns the next scene
+    to show as a (name, kwargs) tuple, or None to quit. Scenes never call each other, so
+    the stack doesn't grow with every restart and everything a scene created (e.g. its
+    Board) is released as soon as it returns.
+"""
+
+
+class SceneManager:
+    def __init__(self, scenes):
+        """
+        Register the scenes that can be shown.
+
+        Parameters:
+        scenes - dict mapping scene names to scene functions
+
+        Return: None
+        """
+        self.scenes = scenes
+        self.current = None
+
+    def run(self, name, **kwargs):
+        """
+        Show scenes until one returns None, starting with the scene called name.
+
+        Parameters:
+        name - the name of the first scene
+        kwargs - keyword arguments passed to the first scene
+
+        Return:
+        int, the number of scenes shown
+        """
+        shown = 0
+        next_scene = (name, kwargs)
+        while next_scene is not None:
+            name, kwargs = next_scene
+            if name not in self.scenes:
+                raise ValueError(f"unknown scene {name!r}")
+
+            self.current = name
+            shown += 1
+            # The previous scene's locals are gone by now, so only one screen's
+            # resources are alive at a time
+            next_scene = self.scenes[name](**kwargs)
+
+        self.current = None
+        return shown
+
@@ -0,0 +1,82 @@
+import pygame
+
+"""
+    Frame pacing shared by every screen: sleep until an event arrives while idle, cap
+    the frame rate while active, and skip rendering while the window can't be seen
+"""
+
+# Events after which the whole window has to be drawn again
+REDRAW_EVENTS = (
+    pygame.VIDEOEXPOSE,
+    pygame.WINDOWEXPOSED,
+    pygame.WINDOWSHOWN,
+    pygame.WINDOWRESTORED,
+    pygame.WINDOWFOCUSGAINED,
+)
+
+
+class FrameScheduler:
+    def __init__(self, fps=60, idle_timeout=500):
+        """
+        Set up the scheduler for a visible, focused window.
+
+        Parameters:
+        fps - the most frames to render per second
+        idle_timeout - the longest to block waiting for an event, in milliseconds
+
+        Return: None
+        """
+        self.fps = fps
+        self.idle_timeout = idle_timeout
+        self.clock = pygame.time.Clock()
+        self.focused = True
+        self.minimized = False
+
+    def events(self, animating=False):
+        """
+        Get the next batch of events. While nothing is animating this blocks until an
+        event arrives (or idle_timeout passes), so an idle screen uses no CPU.
+
+        Parameters:
+        animating - whether the screen needs new frames even without input
+
+        Return: list of pygame events (empty if the wait timed out)
+        """
+        if animating and self.should_render():
+            self.clock.tick(self.fps)
+            events = pygame.event.get()
+        else:
+            event = pygame.event.wait(self.idle_timeout)
+            events = [] if event.type == pygame.NOEVENT else [event]
+            events.extend(pygame.event.get())
+
+        for event in events:
+            if event.type == pygame.WINDOWFOCUSLOST:
+                self.focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                self.focused = True
+            elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+                self.minimized = True
+            elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN):
+                self.minimized = False
+
+        return events
+
+    def should_render(self):
+        """
+        Check if frames should be drawn, i.e. the window is focused and not minimized.
+
+        Parameters: None
+        Return: boolean
+        """
+        return self.focused and not self.minimized
+
+    def frame_rendered(self):
+        """
+        Call after drawing a frame. Sleeps as needed to keep to the frame rate cap, so a
+        burst of events (e.g. mouse motion) can't render more than fps frames a second.
+
+        Parameters: None
+        Return: None
+        """
+        self.clock.tick(self.fps)
@@ -0,0 +1,295 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter, deque
+from math import log2
+from multiprocessing import Pool
+
+from puzzle_io import board_to_line, line_to_board, positive_int, read_chunks
+from solver import count_solutions, solve
+from validator import unit_name, validate_grids
+
+"""
+    Command line tool that solves or checks a stream of puzzles
+
+    Puzzles are read one per line in the one-line board format of puzzle_io ('.' or '0'
+    for empty cells, so the standard 81 character lines of public puzzle collections
+    work as they are), from a file or stdin. Only the first field of a line is read, so
+    puzzle sets written by batch_generate.py work too. One line is written to stdout for
+    every puzzle, in input order:
+
+    solve mode    - the solution, or "unsolvable" / "invalid"
+    validate mode - "unique", "multiple", "unsolvable" or "invalid"
+
+    Puzzles are handled in chunks, optionally across a process pool. Only a few chunks
+    are in flight at a time, so memory use stays flat however long the stream is. The
+    throughput and per puzzle latency percentiles are reported on stderr at the end.
+
+    Example:
+    python solve_stream.py puzzles.txt --workers 8 > solutions.txt
+    cat top95.txt | python solve_stream.py --validate
+"""
+
+
+class LatencyHistogram:
+    def __init__(self, steps_per_octave=8, octaves=32):
+        """
+        Set up an empty histogram of latencies. Buckets grow geometrically from 1
+        microsecond, so percentiles are within about 9% (with 8 steps per octave)
+        whatever the number of samples.
+
+        Parameters:
+        steps_per_octave - buckets per doubling of the latency
+        octaves - doublings covered; slower samples land in the last bucket
+
+        Return: None
+        """
+        self.steps_per_octave = steps_per_octave
+        self.counts = [0] * (steps_per_octave * octaves + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """
+        Record one latency.
+
+        Parameters:
+        seconds - the latency
+
+        Return: None
+        """
+        micros = seconds * 1e6
+        bucket = 0 if micros <= 1 else int(log2(micros) * self.steps_per_octave) + 1
+        self.counts[min(bucket, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """
+        Estimate a percentile of the recorded latencies.
+
+        Parameters:
+        percent - the percentile, 0 to 100
+
+        Return:
+        float, the upper bound in seconds of the bucket holding the percentile
+        """
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** (bucket / self.steps_per_octave) / 1e6, self.max)
+        return self.max
+
+
+def check_board(board, validate):
+    """
+    Solve or check one puzzle that doesn't break a rule.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells
+    validate - whether to check the puzzle instead of solving it
+
+    Return:
+    tuple of (output line without a newline, verdict, error message or None)
+    """
+    if validate:
+        verdict = ("unsolvable", "unique", "multiple")[count_solutions(board)]
+        return verdict, verdict, None
+
+    solution = solve(board)
+    if solution is None:
+        return "unsolvable", "unsolvable", None
+    return board_to_line(solution), "solved", None
+
+
+def check_chunk(task):
+    """
+    Solve or check one chunk of puzzles. Runs inside a worker process.
+
+    The rules of every puzzle of a size are checked together by validate_grids, whose
+    time is shared out evenly between their latencies.
+
+    Parameters:
+    task - tuple of (list of lines, validate)
+
+    Return:
+    list of (output line, verdict, error message or None, seconds taken) per puzzle
+    """
+    lines, validate = task
+    results = [None] * len(lines)
+    # Board size -> list of (position in the chunk, board, seconds spent parsing)
+    by_size = {}
+    for position, line in enumerate(lines):
+        start = time.perf_counter()
+        try:
+            board = line_to_board(line.split()[0])
+        except ValueError as e:
+            results[position] = (
+                "invalid",
+                "invalid",
+                str(e),
+                time.perf_counter() - start,
+            )
+        else:
+            by_size.setdefault(len(board), []).append(
+                (position, board, time.perf_counter() - start)
+            )
+
+    for size, puzzles in by_size.items():
+        start = time.perf_counter()
+        _, first_units = validate_grids([board for _, board, _ in puzzles])
+        shared = (time.perf_counter() - start) / len(puzzles)
+
+        for (position, board, parsed), unit in zip(puzzles, first_units):
+            start = time.perf_counter()
+            if unit >= 0:
+                message = f"a number is repeated in {unit_name(unit, size)}"
+                result = ("invalid", "invalid", message)
+            else:
+                result = check_board(board, validate)
+            results[position] = (
+                *result,
+                parsed + shared + time.perf_counter() - start,
+            )
+
+    return results
+
+
+def ordered_results(tasks, workers, in_flight):
+    """
+    Run check_chunk over tasks, in order, with at most in_flight chunks submitted but
+    not yet returned.
+
+    Parameters:
+    tasks - iterable of tasks for check_chunk
+    workers - worker processes, 1 to run in this process
+    in_flight - the most chunks queued or running at a time
+
+    Return: generator of check_chunk results
+    """
+    if workers == 1:
+        yield from map(check_chunk, tasks)
+        return
+
+    with Pool(workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(check_chunk, (task,)))
+            if len(pending) >= in_flight:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def report(latencies, verdicts, elapsed, out=sys.stderr):
+    """
+    Print the throughput, the latency percentiles and how many puzzles got each
+    verdict.
+
+    Parameters:
+    latencies - LatencyHistogram of the time spent on each puzzle
+    verdicts - Counter of verdicts
+    elapsed - wall clock seconds for the whole stream
+
+    Return: None
+    """
+    done = latencies.count
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"{done} puzzles in {elapsed:.2f}s  {rate:.1f} puzzles/s", file=out)
+    if done:
+        percentiles = "  ".join(
+            f"p{percent:g} {latencies.percentile(percent) * 1000:.3f}"
+            for percent in (50, 90, 99, 99.9)
+        )
+        print(
+            f"latency ms  {percentiles}  max {latencies.max * 1000:.3f}"
+            f"  mean {latencies.total / done * 1000:.3f}",
+            file=out,
+        )
+    print(
+        "  ".join(f"{verdict} {count}" for verdict, count in sorted(verdicts.items())),
+        file=out,
+    )
+
+
+def run(args):
+    """
+    Solve or check the puzzles described by the parsed command line arguments.
+
+    Return: None
+    """
+    latencies = LatencyHistogram()
+    verdicts = Counter()
+    puzzle_number = 0
+    start = time.perf_counter()
+
+    source = sys.stdin if args.source == "-" else open(args.source)
+    try:
+        tasks = (
+            (chunk, args.validate) for chunk in read_chunks(source, args.chunk_size)
+        )
+        for results in ordered_results(tasks, args.workers, 2 * args.workers):
+            for output, verdict, error, seconds in results:
+                puzzle_number += 1
+                sys.stdout.write(output + "\n")
+                if error is not None:
+                    print(f"puzzle {puzzle_number}: {error}", file=sys.stderr)
+                verdicts[verdict] += 1
+                latencies.add(seconds)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    sys.stdout.flush()
+    if not args.quiet:
+        report(latencies, verdicts, time.perf_counter() - start)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve or check puzzles given one per line."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        help="file of puzzles, one per line (default: stdin)",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="report whether each puzzle has a unique solution instead of solving it",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="worker processes (default: 1, solving in this process)",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunk-size",
+        type=positive_int,
+        default=100,
+        help="puzzles per unit of work",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't report the statistics"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        run(parse_args())
+    except BrokenPipeError:
+        # The reader stopped early (e.g. head). Point stdout at devnull so the final
+        # flush at exit doesn't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,242 @@
+from functools import lru_cache
+from math import isqrt
+
+"""
+    Exact cover solver for sudoku boards (Knuth's Algorithm X)
+
+    Every (row, col, num) placement covers four constraints: the cell is filled, and num
+    appears once in the row, the column and the box. Solving a board means picking
+    placements that cover every constraint exactly once. Like Dancing Links, covering a
+    column unlinks the rows that clash with it and uncovering relinks them in reverse
+    order, but the links are kept in dicts of sets, which is much faster than node
+    objects in Python.
+"""
+
+
+@lru_cache(maxsize=None)
+def _placements(size):
+    """
+    Build the constraint columns covered by every placement on a size x size board.
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return:
+    list indexed by placement id ((row * size + col) * size + num - 1) of the four
+    constraint columns that placement covers
+    """
+    box_length = isqrt(size)
+    area = size * size
+    placements = []
+    for row in range(size):
+        for col in range(size):
+            box = row // box_length * box_length + col // box_length
+            for num in range(size):
+                placements.append(
+                    (
+                        row * size + col,
+                        area + row * size + num,
+                        2 * area + col * size + num,
+                        3 * area + box * size + num,
+                    )
+                )
+    return placements
+
+
+@lru_cache(maxsize=None)
+def _columns(size):
+    """
+    Build the placements that cover each constraint column of an empty board.
+
+    Parameters:
+    size - the number of rows/columns of the board
+
+    Return:
+    list indexed by constraint column of the placement ids covering it
+    """
+    columns = [[] for _ in range(4 * size * size)]
+    for placement, covered in enumerate(_placements(size)):
+        for column in covered:
+            columns[column].append(placement)
+    return columns
+
+
+def _cover(columns, placements, placement):
+    """
+    Choose a placement: remove its columns and every placement that clashes with it.
+
+    Return:
+    list of the removed column sets, needed to undo the cover
+    """
+    removed = []
+    for column in placements[placement]:
+        for other in columns[column]:
+            for clashing in placements[other]:
+                if clashing != column:
+                    columns[clashing].discard(other)
+        removed.append(columns.pop(column))
+    return removed
+
+
+def _uncover(columns, placements, placement, removed):
+    """
+    Undo _cover by relinking the removed columns in reverse order.
+
+    Return: None
+    """
+    for column in reversed(placements[placement]):
+        columns[column] = removed.pop()
+        for other in columns[column]:
+            for clashing in placements[other]:
+                if clashing != column:
+                    columns[clashing].add(other)
+
+
+def _search(columns, placements, chosen):
+    """
+    Yield every exact cover of the remaining columns, always branching on the column
+    with the fewest placements left.
+
+    Return: generator of lists of chosen placement ids
+    """
+    if not columns:
+        yield chosen
+        return
+
+    column = min(columns, key=lambda c: len(columns[c]))
+    for placement in list(columns[column]):
+        removed = _cover(columns, placements, placement)
+        chosen.append(placement)
+        yield from _search(columns, placements, chosen)
+        chosen.pop()
+        _uncover(columns, placements, placement, removed)
+
+
+def _setup(board):
+    """
+    Build the exact cover matrix for a board and cover its filled cells.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells (the format generate_sudoku returns)
+
+    Return:
+    (columns, placements) or None if the filled cells already break a rule
+    """
+    size = len(board)
+    placements = _placements(size)
+    columns = {column: set(rows) for column, rows in enumerate(_columns(size))}
+
+    for row in range(size):
+        for col in range(size):
+            num = board[row][col]
+            if num == 0:
+                continue
+            placement = (row * size + col) * size + num - 1
+            if any(column not in columns for column in placements[placement]):
+                return None
+            _cover(columns, placements, placement)
+
+    return columns, placements
+
+
+def solve(board):
+    """
+    Solve a sudoku board of any perfect-square size.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells (the format generate_sudoku returns)
+
+    Return:
+    a new 2D list with every cell filled in, or None if the board has no solution
+    """
+    setup = _setup(board)
+    if setup is None:
+        return None
+
+    size = len(board)
+    solution = [row[:] for row in board]
+    for chosen in _search(*setup, []):
+        for placement in chosen:
+            cell, num = divmod(placement, size)
+            solution[cell // size][cell % size] = num + 1
+        return solution
+    return None
+
+
+def count_solutions(board, limit=2):
+    """
+    Count the solutions of a sudoku board, stopping as soon as limit is reached.
+
+    With the default limit of 2 this is a uniqueness check: 0 means unsolvable, 1 means
+    the puzzle is unique and 2 means it has more than one solution.
+
+    Parameters:
+    board - 2D list of ints, 0 for empty cells (the format generate_sudoku returns)
+    limit - the most solutions to look for
+
+    Return:
+    int, the number of solutions found (at most limit)
+    """
+    setup = _setup(board)
+    if setup is None:
+        return 0
+
+    count = 0
+    for _ in _search(*setup, []):
+        count += 1
+        if count >= limit:
+            break
+    return count
+
+
+def benchmark(rounds=200):
+    """
+    Compare the exact cover solver against SudokuGenerator.fill_remaining (the MRV
+    backtracking fill) and time the uniqueness check on freshly generated puzzles.
+
+    Parameters:
+    rounds - the number of boards to time for each measurement
+
+    Return: None
+    """
+    import time
+    from difficulty import Difficulty, DifficultyLevel
+    from generator import SudokuGenerator, generate_sudoku
+
+    # fill_remaining completes a board seeded with fill_diagonal, so both solvers are
+    # given the same seeded boards
+    seeded = []
+    for _ in range(rounds):
+        sudoku = SudokuGenerator(9, 0)
+        sudoku.fill_diagonal()
+        seeded.append(sudoku)
+
+    start = time.perf_counter()
+    for sudoku in seeded:
+        solve(sudoku.get_board())
+    exact_cover = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sudoku in seeded:
+        sudoku.fill_remaining()
+    mrv_fill = time.perf_counter() - start
+
+    print(f"complete a seeded board ({rounds} boards)")
+    print(f"  MRV fill     {mrv_fill / rounds * 1000:8.3f} ms/board")
+    print(f"  exact cover  {exact_cover / rounds * 1000:8.3f} ms/board")
+
+    for level in DifficultyLevel:
+        Difficulty.set_difficulty(level)
+        puzzles = [generate_sudoku(9, level.value) for _ in range(rounds)]
+
+        start = time.perf_counter()
+        for puzzle in puzzles:
+            count_solutions(puzzle)
+        elapsed = time.perf_counter() - start
+
+        print(f"count_solutions on {level.name} ({rounds} puzzles)")
+        print(f"  exact cover  {elapsed / rounds * 1000:8.3f} ms/puzzle")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,5 +1,14 @@
+import os
 import pygame
-from sudoku_generator import Cell, Board, generate_sudoku
+from sudoku_generator import Cell, Board
+from puzzle_bank import PuzzleBank
+from prefetch import PuzzlePrefetcher
+from render_cache import text_cache
+from layers import ScaledBackground
+from dirty import DirtyRegions
+from scheduler import FrameScheduler, REDRAW_EVENTS
+from scene_manager import SceneManager
+from savegame import SaveWriter, load_game
 from difficulty import Difficulty, DifficultyLevel
 from button import get_buttons
 
@@ -8,6 +17,10 @@ pygame.font.init()
 
 # Setting up global constants for later use
 MAX_MISTAKES = 3
+# Most frames drawn per second while the screen is changing
+MAX_FPS = 60
+# Rows/columns of the board, any perfect square (4, 9, 16, 25)
+BOARD_SIZE = 9
 WINDOW_WIDTH = 590 * 1.5
 WINDOW_HEIGHT = 410 * 1.5
 BOARD_X = 10 * WINDOW_WIDTH / 590
@@ -19,8 +32,14 @@ WINDOW = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 pygame.display.set_caption("Smiski Sudoku")
 
 # Setting up two fonts, one for the sudoku board and the other for ui such as the mistake counter
-BOARD_FONT = pygame.font.SysFont(None, 20 if WINDOW_WIDTH <= 590 else 32)
+BOARD_FONT = pygame.font.SysFont(
+    None, int((20 if WINDOW_WIDTH <= 590 else 32) * min(1, 9 / BOARD_SIZE) ** 0.5)
+)
 UI_FONT = pygame.font.SysFont(None, 20 if WINDOW_WIDTH <= 590 else 32)
+# Pencil marks fill a mini-grid inside each cell, one row/column per box row/column
+MARK_FONT = pygame.font.SysFont(
+    None, int(WINDOW_HEIGHT / 9.5 * 9 / BOARD_SIZE / BOARD_SIZE**0.5 * 0.9)
+)
 
 UI_FONT_COLOR = (248, 253, 232)
 UI_FONT_OUTLINE_COLOR = (84, 118, 44)
@@ -29,70 +48,195 @@ UI_FONT_OUTLINE_COLOR = (84, 118, 44)
 MISTAKE_X = 0.925 * WINDOW_WIDTH
 MISTAKE_Y = 0.058 * WINDOW_HEIGHT
 
+# Optional pre-built puzzle bank (see puzzle_bank.py), used instead of generating puzzles
+PUZZLE_BANK_PATH = "assets/puzzles.bank"
+# The game in progress, saved on every placement and resumed at startup
+SAVE_PATH = "savegame.bin"
+# Writes the saves on a background thread, so syncing them to disk never stalls a frame
+saver = SaveWriter()
+
 (reset_button, restart_button, exit_button, easy_button, medium_button, hard_button) = (
     get_buttons(WINDOW_WIDTH, WINDOW_HEIGHT)
 )
 
-# Setting up background images
-main_menu_bg = pygame.image.load("assets/menu.webp").convert()
-game_bg = pygame.image.load("assets/game.webp").convert()
-won_bg = pygame.image.load("assets/won.webp").convert()
-lost_bg = pygame.image.load("assets/lost.webp").convert()
+# Setting up background images, scaled to the window once instead of every frame
+main_menu_bg = ScaledBackground(pygame.image.load("assets/menu.webp").convert())
+game_bg = ScaledBackground(pygame.image.load("assets/game.webp").convert())
+won_bg = ScaledBackground(pygame.image.load("assets/won.webp").convert())
+lost_bg = ScaledBackground(pygame.image.load("assets/lost.webp").convert())
+
+Cell.init(BOARD_X, BOARD_Y, WINDOW, BOARD_FONT, BOARD_SIZE, MARK_FONT)
+
+puzzle_bank = PuzzleBank(PUZZLE_BANK_PATH) if os.path.exists(PUZZLE_BANK_PATH) else None
+
+
+def in_bank(difficulty: DifficultyLevel):
+    """
+        Checks if the puzzle bank has puzzles of a difficulty for this board size
+
+        Return: boolean
+    """
+
+    return (
+        puzzle_bank is not None
+        and puzzle_bank.size == BOARD_SIZE
+        and puzzle_bank.count(difficulty) > 0
+    )
+
+
+# Keeps puzzles ready for the difficulties the bank doesn't cover once main() starts it.
+# They're generated in a worker process, graded by the techniques needed to solve them
+# rather than by the cells removed, and always unique, so the stored solution is the
+# only one a player can reach.
+prefetcher = PuzzlePrefetcher(
+    BOARD_SIZE, [level for level in DifficultyLevel if not in_bank(level)]
+)
+
+
+def new_puzzle(difficulty: DifficultyLevel):
+    """
+        Gets a new puzzle and its solution, from the puzzle bank if it has the difficulty
+        or from the prefetcher otherwise, so the game loop never generates one itself.
+
+        Return: tuple of (board, solution)
+    """
+
+    if in_bank(difficulty):
+        return puzzle_bank.random_puzzle(difficulty)
+    return prefetcher.get(difficulty)
+
 
-Cell.init(BOARD_X, BOARD_Y, WINDOW, BOARD_FONT)
+# Shared by every screen: idles in pygame.event.wait instead of spinning, caps the frame
+# rate and skips drawing while the window is minimized or unfocused
+scheduler = FrameScheduler(MAX_FPS)
 
 
 def draw_outlined_text(txt, x, y):
     thickness = 2
 
     WINDOW.blit(
-        UI_FONT.render(txt, True, UI_FONT_OUTLINE_COLOR), (x - thickness, y - thickness)
+        text_cache.render_outlined(
+            UI_FONT, txt, UI_FONT_COLOR, UI_FONT_OUTLINE_COLOR, thickness
+        ),
+        (x - thickness, y - thickness),
     )
 
-    WINDOW.blit(
-        UI_FONT.render(txt, True, UI_FONT_OUTLINE_COLOR), (x + thickness, y - thickness)
-    )
 
-    WINDOW.blit(
-        UI_FONT.render(txt, True, UI_FONT_OUTLINE_COLOR), (x - thickness, y + thickness)
-    )
+def get_mistake_rect(mistakes):
+    """
+        Gets the area of the screen covered by the mistake counter text
 
-    WINDOW.blit(
-        UI_FONT.render(txt, True, UI_FONT_OUTLINE_COLOR), (x + thickness, y + thickness)
+        Return: pygame.Rect
+    """
+
+    surface = text_cache.render_outlined(
+        UI_FONT, f"{mistakes}/{MAX_MISTAKES}", UI_FONT_COLOR, UI_FONT_OUTLINE_COLOR
     )
+    return pygame.Rect(MISTAKE_X - 2, MISTAKE_Y - 2, *surface.get_size())
+
+
+def draw_game(display_board, mistakes):
+    """
+        Redraws the parts of the game screen that changed since the last frame and only
+        pushes those regions to the display
+    """
+
+    rects = display_board.dirty.take()
+
+    if rects is None:
+        game_bg.draw(WINDOW)
+        draw_outlined_text(f"{mistakes}/{MAX_MISTAKES}", MISTAKE_X, MISTAKE_Y)
+        display_board.draw()
+        pygame.display.update()
+        return
+
+    # Every layer is redrawn clipped to each region, so the blits only touch its pixels
+    for rect in rects:
+        WINDOW.set_clip(rect)
+        game_bg.draw(WINDOW)
+        if rect.colliderect(get_mistake_rect(mistakes)):
+            draw_outlined_text(f"{mistakes}/{MAX_MISTAKES}", MISTAKE_X, MISTAKE_Y)
+        display_board.draw(rect)
+    WINDOW.set_clip(None)
 
-    WINDOW.blit(UI_FONT.render(txt, (x, y), UI_FONT_COLOR), (x, y))
+    if rects:
+        pygame.display.update(rects)
 
 
-def init_board() -> Board:
+def init_board(saved=None) -> Board:
     """
-        Initializes the sudoku board to be displayed and fills in the values according to the 
-        SudokuGenerator generated board.
+        Initializes the sudoku board to be displayed and fills in the values according to a
+        puzzle from the bank or the prefetcher.
+
+        Parameters:
+        saved - optional savegame.SavedGame to resume instead
 
         Return: Board
     """
-    
-    sudoku_board = generate_sudoku(9, Difficulty.get_difficulty().value)
-    display_board = Board(BOARD_X, BOARD_Y, 9, 9, WINDOW, BOARD_FONT, sudoku_board)
+
+    if saved is not None:
+        return Board(
+            BOARD_X,
+            BOARD_Y,
+            BOARD_SIZE,
+            BOARD_SIZE,
+            WINDOW,
+            BOARD_FONT,
+            None,
+            saved.solution,
+            saved.state,
+        )
+
+    sudoku_board, solution = new_puzzle(Difficulty.get_difficulty())
+    display_board = Board(
+        BOARD_X,
+        BOARD_Y,
+        BOARD_SIZE,
+        BOARD_SIZE,
+        WINDOW,
+        BOARD_FONT,
+        sudoku_board,
+        solution,
+    )
 
     return display_board
 
 
+def save(display_board, mistakes):
+    """
+        Saves the game in progress so it can be resumed after the window is closed. Only
+        the snapshot is taken here; it's written in the background.
+    """
+
+    saver.save(
+        SAVE_PATH,
+        display_board.state,
+        display_board.solution,
+        mistakes,
+        Difficulty.get_difficulty(),
+    )
+
+
 def status_loop(won=False):
     """
         Loop for rendering the status (game won/game lost) screen
 
         Note: exit_button could refer to either the restart or exit button based on whether the
         player won or lsot
+
+        Return: the next scene, or None to quit
     """
 
     # 0 -> Quit
     # 1 -> Restart/Exit
     state = 0
 
+    # Nothing on this screen changes, so it's only drawn again if the window is exposed
+    dirty = DirtyRegions()
+
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in scheduler.events():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
@@ -100,33 +244,38 @@ def status_loop(won=False):
                     state = 1
                     running = False
             if event.type == pygame.MOUSEMOTION:
-                x, y = pygame.mouse.get_pos()
+                x, y = event.pos
 
                 exit_button.update_hover(x, y)
+            if event.type in REDRAW_EVENTS:
+                dirty.invalidate()
 
-        WINDOW.fill("white")
-
-        WINDOW.blit(
-            pygame.transform.scale(
-                won_bg if won else lost_bg, (WINDOW.get_width(), WINDOW.get_height())
-            ),
-            (0, 0),
-        )
-
-        pygame.display.update()
+        if dirty and scheduler.should_render():
+            dirty.take()
+            (won_bg if won else lost_bg).draw(WINDOW)
+            pygame.display.update()
+            scheduler.frame_rendered()
 
     if state == 1 and not won:
-        menu_loop()
+        return ("menu", {})
 
 
-def game_loop():
+def game_loop(saved=None):
     """
         Loop for rendering the game screen with the sudoku board
+
+        Parameters:
+        saved - optional savegame.SavedGame to resume instead of starting a new game
+
+        Return: the next scene, or None to quit
     """
-    
-    display_board = init_board()
 
-    mistakes = 0
+    if saved is not None:
+        Difficulty.set_difficulty(saved.difficulty)
+
+    display_board = init_board(saved)
+
+    mistakes = 0 if saved is None else saved.mistakes
 
     # 0 -> Quit
     # 1 -> Restart
@@ -136,16 +285,18 @@ def game_loop():
 
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in scheduler.events():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                x, y = pygame.mouse.get_pos()
+                x, y = event.pos
                 display_board.click(x, y)
 
                 if reset_button.hover:
                     display_board.reset_to_original()
+                    display_board.dirty.add(get_mistake_rect(mistakes))
                     mistakes = 0
+                    save(display_board, mistakes)
 
                 if restart_button.hover:
                     state = 1
@@ -155,7 +306,7 @@ def game_loop():
                     state = 0
                     running = False
             if event.type == pygame.MOUSEMOTION:
-                x, y = pygame.mouse.get_pos()
+                x, y = event.pos
 
                 display_board.update_hover(x, y)
 
@@ -163,20 +314,48 @@ def game_loop():
                 restart_button.update_hover(x, y)
                 exit_button.update_hover(x, y)
             if event.type == pygame.KEYDOWN:
-                if event.key >= pygame.K_1 and event.key <= pygame.K_9:
-                    res = display_board.sketch(event.key - pygame.K_0)
+                if event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                    if display_board.undo():
+                        save(display_board, mistakes)
+                elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                    if display_board.redo():
+                        save(display_board, mistakes)
+                elif event.key == pygame.K_h and (
+                    BOARD_SIZE <= 16 or event.mod & pygame.KMOD_CTRL
+                ):
+                    # On 25x25 boards H is a number, so hints need Ctrl+H there
+                    display_board.show_hint()
+                elif event.key >= pygame.K_1 and event.key <= pygame.K_9:
+                    if event.key - pygame.K_0 <= BOARD_SIZE:
+                        if event.mod & pygame.KMOD_SHIFT: # pencil mark
+                            display_board.toggle_mark(event.key - pygame.K_0)
+                        else:
+                            res = display_board.sketch(event.key - pygame.K_0)
+                elif pygame.K_a <= event.key < pygame.K_a + BOARD_SIZE - 9:
+                    # Letters stand for 10 and above on boards larger than 9x9
+                    if event.mod & pygame.KMOD_SHIFT: # pencil mark
+                        display_board.toggle_mark(event.key - pygame.K_a + 10)
+                    else:
+                        res = display_board.sketch(event.key - pygame.K_a + 10)
                 elif event.key == pygame.K_BACKSPACE:
-                    display_board.sketch(0) # 0 -> erase
+                    if event.mod & pygame.KMOD_SHIFT:
+                        display_board.toggle_mark(0) # 0 -> clear every mark
+                    else:
+                        display_board.sketch(0) # 0 -> erase
                 elif event.key == pygame.K_RETURN:
                     res = display_board.place_number()
                     if res == -1: # incorrect value
+                        display_board.dirty.add(get_mistake_rect(mistakes))
                         mistakes += 1
+                        display_board.dirty.add(get_mistake_rect(mistakes))
                         if mistakes == MAX_MISTAKES:
                             state = 2
                             running = False
                     elif res == 1: # board is filled and correct
                         state = 3
                         running = False
+                    if res in (-1, None):
+                        save(display_board, mistakes)
                 elif event.key == pygame.K_RIGHT:
                     display_board.move_selected((1, 0))
                 elif event.key == pygame.K_LEFT:
@@ -185,40 +364,45 @@ def game_loop():
                     display_board.move_selected((0, 1))
                 elif event.key == pygame.K_UP:
                     display_board.move_selected((0, -1))
+            if event.type in REDRAW_EVENTS:
+                display_board.dirty.invalidate()
 
-        WINDOW.fill("white")
+        if display_board.dirty and scheduler.should_render():
+            draw_game(display_board, mistakes)
+            scheduler.frame_rendered()
 
-        WINDOW.blit(
-            pygame.transform.scale(game_bg, (WINDOW.get_width(), WINDOW.get_height())),
-            (0, 0),
-        )
-
-        draw_outlined_text(f"{mistakes}/{MAX_MISTAKES}", MISTAKE_X, MISTAKE_Y)
-
-        display_board.draw()
-
-        pygame.display.update()
+    if state == 0:
+        # Quit, so keep sketches and pencil marks made since the last placement too
+        save(display_board, mistakes)
+    else:
+        # The game is over or was abandoned for a new one
+        saver.delete(SAVE_PATH)
 
     match state:
         case 1:
-            menu_loop()
+            return ("menu", {})
         case 2:
-            status_loop(False)
+            return ("status", {"won": False})
         case 3:
-            status_loop(True)
+            return ("status", {"won": True})
 
 
 def menu_loop():
     """
         Loop for rendering the main menu/start screen
+
+        Return: the next scene, or None to quit
     """
     
+    # Nothing on this screen changes, so it's only drawn again if the window is exposed
+    dirty = DirtyRegions()
+
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in scheduler.events():
             if event.type == pygame.QUIT:
                 running = False
-                return
+                return None
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                 if easy_button.hover:
                     Difficulty.set_difficulty(DifficultyLevel.EASY)
@@ -233,31 +417,48 @@ def menu_loop():
                     running = False
 
             if event.type == pygame.MOUSEMOTION:
-                x, y = pygame.mouse.get_pos()
+                x, y = event.pos
 
                 easy_button.update_hover(x, y)
                 medium_button.update_hover(x, y)
                 hard_button.update_hover(x, y)
+            if event.type in REDRAW_EVENTS:
+                dirty.invalidate()
 
-        # Default background color in case image doesn't load properly
-        WINDOW.fill("white")
+        if dirty and scheduler.should_render():
+            dirty.take()
+            # Draws the main menu background/buttons, scaled to fill the screen
+            main_menu_bg.draw(WINDOW)
+            pygame.display.update()
+            scheduler.frame_rendered()
 
-        # Transforms main menu background/buttons to fill the screen and then draws them
-        WINDOW.blit(
-            pygame.transform.scale(
-                main_menu_bg, (WINDOW.get_width(), WINDOW.get_height())
-            ),
-            (0, 0),
-        )
+    # Game Loop
+    return ("game", {})
 
-        pygame.display.update()
 
-    # Game Loop
-    game_loop()
+# Screens are shown one at a time from SceneManager's loop instead of calling each other
+scenes = SceneManager({"menu": menu_loop, "game": game_loop, "status": status_loop})
 
 
 def main():
-    menu_loop()
+    prefetcher.start()
+
+    try:
+        saved = load_game(SAVE_PATH)
+        # A save from another board size, or one that should already have been lost,
+        # starts a new game instead
+        if (
+            saved is not None
+            and saved.state.size == BOARD_SIZE
+            and saved.mistakes < MAX_MISTAKES
+        ):
+            scenes.run("game", saved=saved)
+        else:
+            scenes.run("menu")
+    finally:
+        prefetcher.stop()
+        # The last save has to be on disk before the process exits
+        saver.flush()
 
 
 if __name__ == "__main__":
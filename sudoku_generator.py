@@ -1,8 +1,22 @@
 import pygame
-import random
-from copy import deepcopy
 from enum import Enum
-from difficulty import Difficulty
+from puzzle_io import DIGITS
+from render_cache import text_cache
+from layers import grid_surface
+from dirty import DirtyRegions
+from board_state import BoardState, cell_peers
+from journal import Journal
+from hints import HintEngine
+# The generator lives in generator.py, without pygame; it is re-exported here so
+# existing imports keep working
+from generator import (
+    BAND_REMOVED,
+    SudokuGenerator,
+    generate_sudoku,
+    generate_puzzle,
+    generate_graded,
+    seeded_puzzle,
+)
 
 """
     Enum to store color data in RGB format
@@ -17,252 +31,27 @@ class Color(Enum):
 
 
 """
-    Used to generate a sudoku board
-"""
-
-
-class SudokuGenerator:
-    full_board = None
-
-    """
-        create a sudoku board - initialize class variables and set up the 2D board
-        This should initialize:
-        self.row_length		- the length of each row
-        self.removed_cells	- the total number of cells to be removed
-        self.board			- a 2D list of ints to represent the board
-        self.box_length		- the square root of row_length
-
-        Parameters:
-    row_length is the number of rows/columns of the board (always 9 for this project)
-    removed_cells is an integer value - the number of cells to be removed
-
-        Return:
-        None
-    """
-
-    def __init__(self, row_length, removed_cells):
-        self.row_length = row_length
-        self.removed_cells = removed_cells
-        self.board = [[0 for _ in range(row_length)] for _ in range(row_length)]
-        self.box_length = int(self.row_length**0.5)
-
-    """
-	Returns a 2D python list of numbers which represents the board
-
-	Parameters: None
-	Return: list[list]
-    """
-
-    def get_board(self):
-        return self.board
-
-    @classmethod
-    def get_full_board(cls):
-        return cls.full_board
-
-    """
-	Displays the board to the console
-    This is not strictly required, but it may be useful for debugging purposes
-
-	Parameters: None
-	Return: None
-    """
-
-    def print_board(self):
-        for row in self.board:
-            print(" ".join(str(num) if num != 0 else "." for num in row))
-
-    """
-	Determines if num is contained in the specified row (horizontal) of the board
-    If num is already in the specified row, return False. Otherwise, return True
-
-	Parameters:
-	row is the index of the row we are checking
-	num is the value we are looking for in the row
-
-	Return: boolean
-    """
-
-    def valid_in_row(self, row, num):
-        return num not in self.board[row]
-
-    """
-	Determines if num is contained in the specified column (vertical) of the board
-    If num is already in the specified col, return False. Otherwise, return True
-
-	Parameters:
-	col is the index of the column we are checking
-	num is the value we are looking for in the column
-
-	Return: boolean
-    """
-
-    def valid_in_col(self, col, num):
-        return num not in [self.board[row][col] for row in range(self.row_length)]
-
-    """
-	Determines if num is contained in the 3x3 box specified on the board
-    If num is in the specified box starting at (row_start, col_start), return False.
-    Otherwise, return True
-
-	Parameters:
-	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
-	num is the value we are looking for in the box
-
-	Return: boolean
-    """
-
-    def valid_in_box(self, row_start, col_start, num):
-        for row in range(row_start, row_start + 3):
-            for col in range(col_start, col_start + 3):
-                if self.board[row][col] == num:
-                    return False
-        return True
-
-    """
-    Determines if it is valid to enter num at (row, col) in the board
-    This is done by checking that num is unused in the appropriate, row, column, and box
-
-	Parameters:
-	row and col are the row index and col index of the cell to check in the board
-	num is the value to test if it is safe to enter in this cell
-
-	Return: boolean
-    """
-
-    def is_valid(self, row, col, num):
-        return (
-            self.valid_in_row(row, num)
-            and self.valid_in_col(col, num)
-            and self.valid_in_box(row - row % 3, col - col % 3, num)
-        )
-
-    """
-    Fills the specified 3x3 box with values
-    For each position, generates a random digit which has not yet been used in the box
-
-	Parameters:
-	row_start and col_start are the starting indices of the box to check
-	i.e. the box is from (row_start, col_start) to (row_start+2, col_start+2)
-
-	Return: None
-    """
-
-    def fill_box(self, row_start, col_start):
-        nums = list(range(1, 10))
-        random.shuffle(nums)
-        for row in range(row_start, row_start + 3):
-            for col in range(col_start, col_start + 3):
-                self.board[row][col] = nums.pop()
-
-    """
-    Fills the three boxes along the main diagonal of the board
-    These are the boxes which start at (0,0), (3,3), and (6,6)
-
-	Parameters: None
-	Return: None
-    """
-
-    def fill_diagonal(self):
-        for i in range(0, self.row_length, 3):
-            self.fill_box(i, i)
-
-    """
-    DO NOT CHANGE
-    Provided for students
-    Fills the remaining cells of the board
-    Should be called after the diagonal boxes have been filled
-
-	Parameters:
-	row, col specify the coordinates of the first empty (0) cell
-
-	Return:
-	boolean (whether or not we could solve the board)
-    """
-
-    def fill_remaining(self, row, col):
-        if col >= self.row_length and row < self.row_length - 1:
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
-
-    """
-    DO NOT CHANGE
-    Provided for students
-    Constructs a solution by calling fill_diagonal and fill_remaining
-
-	Parameters: None
-	Return: None
-    """
-
-    def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, self.box_length)
-
-    """
-    Removes the appropriate number of cells from the board
-    This is done by setting some values to 0
-    Should be called after the entire solution has been constructed
-    i.e. after fill_values has been called
-
-    NOTE: Be careful not to 'remove' the same cell multiple times
-    i.e. if a cell is already 0, it cannot be removed again
-
-	Parameters: None
-	Return: None
-    """
-
-    def remove_cells(self):  # Sagan
-        SudokuGenerator.full_board = deepcopy(self.board)
-
-        empty_cells = Difficulty.get_difficulty().value
-
-        a = [0] * empty_cells + [1] * (self.row_length**2 - empty_cells)
-
-        random.shuffle(a)
-
-        for i in range(self.row_length):
-            for j in range(self.row_length):
-                if a[i * self.row_length + j] == 0:
-                    self.board[i][j] = 0
-
-
-"""
-    Used for storing and displaying cells and their data respectively
+    Used for accessing and displaying cells and their data respectively. A Cell is a
+    view of one cell of a Board's BoardState and holds no data of its own.
 """
 
 
 class Cell:
     HIGHLIGHT_COLOR = Color.GREEN.value
+    HINT_COLOR = Color.LIGHT_GREEN.value
     SELECTED_COLOR = Color.STEEL_BLUE.value
     INVALID_COLOR = Color.RED.value
+    VALUE_COLOR = (20, 20, 20)
+    SKETCH_COLOR = (100, 100, 100)
 
     screen = None
+    board_size = 9
+    box_length = 3
+
+    __slots__ = ("state", "index", "row", "col")
 
     @classmethod
-    def init(cls, x, y, screen, font):
+    def init(cls, x, y, screen, font, board_size=9, mark_font=None):
         """
         Initialize class-level variables for the Cell class.
 
@@ -271,30 +60,61 @@ class Cell:
         y - y-coordinate of the board's starting position
         screen - Pygame screen surface to draw on
         font - Pygame font to render text
+        board_size - number of rows/columns of the board
+        mark_font - Pygame font to render pencil marks (defaults to font)
 
         Return: None
         """
         cls.screen = screen
         cls.font = font
+        cls.mark_font = mark_font or font
         cls.board_x = x
         cls.board_y = y
+        cls.board_size = board_size
+        cls.box_length = int(board_size**0.5)
 
     @classmethod
     def get_cell_size(cls):
         """
-        Calculate the size of each cell based on the screen height.
+        Calculate the size of each cell based on the screen height. The board always
+        takes up the same space, so cells shrink as the board size grows.
 
         Parameters: None
         Return: float representing the cell size
         """
-        return cls.screen.get_height() / 9.5
+        return cls.screen.get_height() / 9.5 * 9 / cls.board_size
 
-    def __init__(self, value, row, col):
-        self.value = value
-        self.sketched_value = 0
+    def __init__(self, state, row, col):
+        self.state = state
+        self.index = state.index(row, col)
         self.row = row
         self.col = col
-        self.invalid = False
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Cell)
+            and self.state is other.state
+            and self.index == other.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.state), self.index))
+
+    @property
+    def value(self):
+        return self.state.values[self.index]
+
+    @property
+    def sketched_value(self):
+        return self.state.sketches[self.index]
+
+    @property
+    def invalid(self):
+        return self.state.invalid[self.index] != 0
+
+    @property
+    def marks(self):
+        return self.state.marks[self.index]
 
     def set_invalid(self):
         """
@@ -303,7 +123,7 @@ class Cell:
         Parameters: None
         Return: None
         """
-        self.invalid = True
+        self.state.invalid[self.index] = 1
 
     def set_value(self, value):
         """
@@ -312,10 +132,12 @@ class Cell:
         Parameters:
         value - the number to set in the cell
 
-        Return: None
+        Return:
+        mask of the peers whose pencil mark for value was removed (see
+        BoardState.set_value)
         """
-        self.invalid = False
-        self.value = value
+        self.state.invalid[self.index] = 0
+        return self.state.set_value(self.index, value)
 
     def set_sketched_value(self, value):
         """
@@ -326,20 +148,46 @@ class Cell:
 
         Return: None
         """
-        self.sketched_value = value
+        self.state.sketches[self.index] = value
+
+    def get_rect(self):
+        """
+        Get the area of the screen the cell is drawn in.
+
+        Parameters: None
+        Return: pygame.Rect
+        """
+        cell_size = Cell.get_cell_size()
+        return pygame.Rect(
+            Cell.board_x + self.col * cell_size,
+            Cell.board_y + self.row * cell_size,
+            cell_size,
+            cell_size,
+        )
 
-    def draw(self, selected=False, highlighted=False):
+    def draw(self, selected=False, highlighted=False, hinted=False):
         """
         Draw the cell on the screen, with optional selection and highlight states.
 
         Parameters:
         selected - boolean indicating if the cell is currently selected
         highlighted - boolean indicating if the cell is currently highlighted
+        hinted - boolean indicating if the cell is part of the hint being shown
 
         Return: None
         """
-        cell_x = Cell.board_x + self.col * Cell.get_cell_size()
-        cell_y = Cell.board_y + self.row * Cell.get_cell_size()
+        cell_size = Cell.get_cell_size()
+        cell_x = Cell.board_x + self.col * cell_size
+        cell_y = Cell.board_y + self.row * cell_size
+
+        if hinted:
+            # Inset so the grid lines stay visible
+            pygame.draw.rect(
+                Cell.screen,
+                Cell.HINT_COLOR,
+                pygame.Rect(cell_x + 3, cell_y + 3, cell_size - 5, cell_size - 5),
+                border_radius=5,
+            )
 
         if self.invalid or selected or highlighted:
             pygame.draw.rect(
@@ -349,84 +197,169 @@ class Cell:
                     if self.invalid
                     else Cell.SELECTED_COLOR if selected else Cell.HIGHLIGHT_COLOR
                 ),
-                pygame.Rect(
-                    cell_x + 1, cell_y + 1, Cell.get_cell_size(), Cell.get_cell_size()
-                ),
+                pygame.Rect(cell_x + 1, cell_y + 1, cell_size, cell_size),
                 3,
                 border_radius=5,
             )
 
         if self.value == 0:
             if self.sketched_value == 0:
+                if self.marks:
+                    self.draw_marks(cell_x, cell_y, cell_size)
                 return
-            text = Cell.font.render(str(self.sketched_value), True, (100, 100, 100))
-            Cell.screen.blit(text, (cell_x + 10, cell_y + 10))
+            # Values above 9 are shown as letters so every cell holds a single glyph
+            text = text_cache.render(
+                Cell.font, DIGITS[self.sketched_value], Cell.SKETCH_COLOR
+            )
+            offset = cell_size * 0.15
+            Cell.screen.blit(text, (cell_x + offset, cell_y + offset))
             return
 
-        text = Cell.font.render(str(self.value), True, (20, 20, 20))
-        text_width, text_height = Cell.font.size(str(self.value))
+        text = text_cache.render(Cell.font, DIGITS[self.value], Cell.VALUE_COLOR)
+        text_width, text_height = text.get_size()
         Cell.screen.blit(
             text,
             (
-                cell_x + (Cell.get_cell_size() - text_width) // 2,
-                cell_y + (Cell.get_cell_size() - text_height) // 2,
+                cell_x + (cell_size - text_width) // 2,
+                cell_y + (cell_size - text_height) // 2,
             ),
         )
 
+    def draw_marks(self, cell_x, cell_y, cell_size):
+        """
+        Draw the cell's pencil marks as a mini-grid, each number in the same spot as
+        in a box (so a 3x3 grid on a 9x9 board).
+
+        Parameters:
+        cell_x - x-coordinate of the cell's top left corner
+        cell_y - y-coordinate of the cell's top left corner
+        cell_size - width/height of the cell
+
+        Return: None
+        """
+        # Inset so the marks clear the selection outline
+        inset = 4
+        step = (cell_size - 2 * inset) / Cell.box_length
+        marks = self.marks
+
+        for num in range(1, Cell.board_size + 1):
+            if not marks >> num & 1:
+                continue
+            text = text_cache.render(Cell.mark_font, DIGITS[num], Cell.SKETCH_COLOR)
+            text_width, text_height = text.get_size()
+            row, col = divmod(num - 1, Cell.box_length)
+            Cell.screen.blit(
+                text,
+                (
+                    cell_x + inset + col * step + (step - text_width) / 2,
+                    cell_y + inset + row * step + (step - text_height) / 2,
+                ),
+            )
+
 
 class Board:
-    def __init__(self, x, y, width, height, screen, font, board):
+    def __init__(
+        self, x, y, width, height, screen, font, board, solution=None, state=None
+    ):
         self.x = x
         self.y = y
         self.width = width
         self.height = height
+        self.box_length = int(width**0.5)
         self.screen = screen
         self.font = font
         self.selected_cell = None
         self.highlighted_cell = None
-        self.update_board(width, height, board)
+        # Screen regions that changed since the last frame
+        self.dirty = DirtyRegions()
+        # Defaults to the solution of the last board SudokuGenerator generated
+        self.solution = solution or SudokuGenerator.get_full_board()
+        if state is None:
+            self.update_board(width, height, board)
+        else:
+            # Resuming a game, e.g. from savegame.load_game
+            self.set_state(state)
 
-    def draw(self):
+    def draw(self, area=None):
         """
         Draw the Sudoku board grid and all cells.
 
-        Parameters: None
+        Parameters:
+        area - optional pygame.Rect; if given only the cells touching it are drawn
+
         Return: None
         """
-        # draws row separating lines
-        for i in range(1, self.height):
-            pygame.draw.line(
-                self.screen,
-                (30, 30, 30),
-                (self.x, self.y + i * Cell.get_cell_size()),
-                (
-                    self.x + self.width * Cell.get_cell_size(),
-                    self.y + i * Cell.get_cell_size(),
-                ),
-                2 + (i % 3 == 0) * 2,
-            )
-
-        # draws column separating lines
-        for i in range(1, self.width):
-            pygame.draw.line(
-                self.screen,
-                (30, 30, 30),
-                (self.x + i * Cell.get_cell_size(), self.y),
-                (
-                    self.x + i * Cell.get_cell_size(),
-                    self.y + self.height * Cell.get_cell_size(),
-                ),
-                2 + (i % 3 == 0) * 2,
-            )
+        # draws the grid lines, which are pre-rendered once per cell size
+        self.screen.blit(
+            grid_surface(
+                self.height, self.width, self.box_length, Cell.get_cell_size()
+            ),
+            (self.x, self.y),
+        )
 
         # draws cells (their numbers and sketched numbers)
-        for row in self.cells:
-            for cell in row:
+        for row in range(self.height):
+            for col in range(self.width):
+                cell = Cell(self.state, row, col)
+                if area is not None and not self.cell_area(cell).colliderect(area):
+                    continue
                 cell.draw(
-                    selected=cell is self.selected_cell,
-                    highlighted=cell is self.highlighted_cell,
+                    selected=cell == self.selected_cell,
+                    highlighted=cell == self.highlighted_cell,
+                    hinted=cell.index in self.hint_cells,
                 )
 
+    def cell_area(self, cell):
+        """
+        Get the screen area a cell can draw over, including its selection outline.
+
+        Parameters:
+        cell - the Cell
+
+        Return: pygame.Rect
+        """
+        return cell.get_rect().inflate(6, 6)
+
+    def mark_dirty(self, cell):
+        """
+        Mark a cell as needing to be redrawn.
+
+        Parameters:
+        cell - the Cell that changed, or None
+
+        Return: None
+        """
+        if cell is not None:
+            self.dirty.add(self.cell_area(cell))
+
+    def set_selected(self, cell):
+        """
+        Change the selected cell, marking the old and new cells dirty.
+
+        Parameters:
+        cell - the Cell to select, or None
+
+        Return: None
+        """
+        if cell != self.selected_cell:
+            self.mark_dirty(self.selected_cell)
+            self.mark_dirty(cell)
+            self.selected_cell = cell
+
+    def set_highlighted(self, cell):
+        """
+        Change the highlighted (hovered) cell, marking the old and new cells dirty.
+
+        Parameters:
+        cell - the Cell to highlight, or None
+
+        Return: None
+        """
+        if cell != self.highlighted_cell:
+            self.mark_dirty(self.highlighted_cell)
+            self.mark_dirty(cell)
+            self.highlighted_cell = cell
+
     def select(self, row, col):
         """
         Select a specific cell on the board.
@@ -437,21 +370,53 @@ class Board:
 
         Return: None
         """
-        self.selected_cell = self.cells[col][row]
+        self.set_selected(self.cell(col, row))
 
     def move_selected(self, disp):
         """
-        Move the currently selected cell by a specified displacement.
+        Move the currently selected cell by a specified displacement, wrapping around
+        the edges of the board.
 
         Parameters:
         disp - tuple of (x_displacement, y_displacement)
 
         Return: None
         """
+        if self.selected_cell is None:
+            return
+
         curr_col = self.selected_cell.col
         curr_row = self.selected_cell.row
 
-        self.selected_cell = self.cells[curr_row + disp[1]][curr_col + disp[0]]
+        self.set_selected(
+            self.cell(
+                (curr_row + disp[1]) % self.height, (curr_col + disp[0]) % self.width
+            )
+        )
+
+    def cell(self, row, col):
+        """
+        Get a view of a cell of the board.
+
+        Parameters:
+        row - row index of the cell
+        col - column index of the cell
+
+        Return: Cell
+        """
+        return Cell(self.state, row, col)
+
+    @property
+    def cells(self):
+        """
+        Views of every cell of the board, row by row.
+
+        Return: 2D list of Cells
+        """
+        return [
+            [Cell(self.state, row, col) for col in range(self.width)]
+            for row in range(self.height)
+        ]
 
     def get_cell(self, row, col):
         """
@@ -490,15 +455,15 @@ class Board:
         """
         curr = self.get_cell(row, col)
         if curr is None:
-            self.highlighted_cell = None
+            self.set_highlighted(None)
             return
 
         row_idx, col_idx = curr
 
-        if self.original_cells[col_idx][row_idx].value == 0:
-            self.highlighted_cell = self.cells[col_idx][row_idx]
+        if not self.state.is_given(col_idx, row_idx):
+            self.set_highlighted(self.cell(col_idx, row_idx))
         else:
-            self.highlighted_cell = None
+            self.set_highlighted(None)
 
         return curr
 
@@ -516,7 +481,7 @@ class Board:
         curr = self.get_cell(row, col)
 
         if curr is None:
-            self.selected_cell = None
+            self.set_selected(None)
             return
 
         self.select(*curr)
@@ -535,7 +500,7 @@ class Board:
 
         cell = self.selected_cell
 
-        if self.original_cells[cell.row][cell.col].value == 0:
+        if not self.state.is_given(cell.row, cell.col):
             return
 
         self.place_number(0)
@@ -557,13 +522,17 @@ class Board:
         row = self.selected_cell.row
         col = self.selected_cell.col
 
-        if self.original_cells[row][col].value != 0:
+        if self.state.is_given(row, col):
             return 0
 
+        before = self.state.save_cell(self.selected_cell.index)
+
         if value == 0:
             self.selected_cell.set_value(0)
 
         self.selected_cell.set_sketched_value(value)
+        self.mark_dirty(self.selected_cell)
+        self.record_move(self.selected_cell, before)
 
     def place_number(self) -> int:
         """
@@ -586,27 +555,177 @@ class Board:
         if value == 0:
             return 0
 
-        self.selected_cell.set_value(value)
+        before = self.state.save_cell(self.selected_cell.index)
 
-        if SudokuGenerator.get_full_board()[row][col] == value:
-            if self.is_full():
-                return 1
-        else:
+        cleared = self.selected_cell.set_value(value)
+        self.mark_dirty(self.selected_cell)
+        self.mark_peers_dirty(self.selected_cell.index, cleared)
+
+        if self.solution[row][col] != value:
             self.selected_cell.set_invalid()
+        self.record_move(self.selected_cell, before, cleared)
+
+        if self.solution[row][col] != value:
             return -1
+        if self.check_board():
+            return 1
+
+    def toggle_mark(self, value):
+        """
+        Toggle a pencil mark in the currently selected cell.
+
+        Parameters:
+        value - the number to toggle, 0 to clear every mark
+
+        Return:
+        0 if the cell already has a number, otherwise None
+        """
+        if self.selected_cell is None:
+            return
+
+        cell = self.selected_cell
+        if cell.value != 0:
+            return 0
+
+        before = self.state.save_cell(cell.index)
+        if value == 0:
+            self.state.marks[cell.index] = 0
+        else:
+            self.state.marks[cell.index] ^= 1 << value
+        self.mark_dirty(cell)
+        self.record_move(cell, before)
+
+    def mark_peers_dirty(self, index, cleared):
+        """
+        Mark the peers of a cell whose pencil marks changed as needing to be redrawn.
+
+        Parameters:
+        index - buffer index of the cell
+        cleared - mask of the changed peers (from BoardState.set_value)
+
+        Return: None
+        """
+        if not cleared:
+            return
+        for k, peer in enumerate(cell_peers(self.state.size)[index]):
+            if cleared >> k & 1:
+                self.mark_dirty(self.cell(*divmod(peer, self.width)))
+
+    def record_move(self, cell, before, cleared=0):
+        """
+        Add a change to a cell to the undo history, if anything changed.
+
+        Parameters:
+        cell - the Cell that was changed
+        before - the cell's fields (from BoardState.save_cell) before the change
+        cleared - mask of the peers whose pencil mark the change removed
+
+        Return: None
+        """
+        after = self.state.save_cell(cell.index)
+        if after != before:
+            self.journal.record(cell.index, before, after, cleared)
+            self.set_hint_cells(())
+
+    def undo(self):
+        """
+        Undo the last sketch, placement, erase or pencil mark change, selecting the cell
+        it changed.
+
+        Parameters: None
+        Return:
+        True if a move was undone, False if there was nothing to undo
+        """
+        move = self.journal.undo()
+        if move is None:
+            return False
+        index, before, after, cleared = move
+        # Putting the old number back takes it out of peers marked since the move was
+        # made, but those marks were there before the move too, so they stay
+        restored = self.apply_move(index, before)
+        self.state.restore_marks(index, before[0], restored)
+        # Placing the number took it out of the peers' pencil marks
+        self.state.restore_marks(index, after[0], cleared)
+        self.mark_peers_dirty(index, cleared)
+        return True
+
+    def redo(self):
+        """
+        Redo the last undone move, selecting the cell it changed.
+
+        Parameters: None
+        Return:
+        True if a move was redone, False if there was nothing to redo
+        """
+        move = self.journal.redo()
+        if move is None:
+            return False
+        index, _, after, _ = move
+        self.apply_move(index, after)
+        return True
+
+    def apply_move(self, index, fields):
+        """
+        Set a cell's fields while stepping through the undo history.
+
+        Parameters:
+        index - buffer index of the cell
+        fields - the (value, sketch, invalid, marks) fields to set
+
+        Return:
+        the mask of peers whose pencil mark setting the number removed
+        """
+        cleared = self.state.restore_cell(index, fields)
+        cell = self.cell(*divmod(index, self.width))
+        self.set_selected(cell)
+        self.mark_dirty(cell)
+        self.mark_peers_dirty(index, cleared)
+        self.set_hint_cells(())
+        return cleared
+
+    def show_hint(self):
+        """
+        Highlight the cells of the next logical step. If the step places a number,
+        its cell is also selected.
+
+        Parameters: None
+        Return:
+        the Hint shown, or None if no technique applies
+        """
+        hint = self.hints.next_hint()
+        if hint is None:
+            self.set_hint_cells(())
+            return None
+
+        self.set_hint_cells(hint.cells)
+        if hint.placement is not None:
+            self.set_selected(self.cell(*divmod(hint.placement[0], self.width)))
+        return hint
+
+    def set_hint_cells(self, cells):
+        """
+        Change the cells highlighted as a hint, marking the old and new cells dirty.
+
+        Parameters:
+        cells - indexes of the cells to highlight
+
+        Return: None
+        """
+        for index in (*self.hint_cells, *cells):
+            self.mark_dirty(self.cell(*divmod(index, self.width)))
+        self.hint_cells = tuple(cells)
 
     def reset_to_original(self):
         """
-        Reset the board to its original state.
+        Reset the board to its original state. This also clears the undo history.
 
         Parameters: None
         Return: None
         """
-        for i in range(self.height):
-            for j in range(self.width):
-                cell = self.original_cells[i][j]
-                self.cells[i][j].set_value(cell.value)
-                self.cells[i][j].set_sketched_value(cell.sketched_value)
+        self.state.reset()
+        self.journal.clear()
+        self.hint_cells = ()
+        self.dirty.invalidate()
 
     def update_board(self, width, height, board):
         """
@@ -619,12 +738,26 @@ class Board:
 
         Return: None
         """
-        self.original_cells = [
-            [Cell(board[i][j], i, j) for j in range(width)] for i in range(height)
-        ]
-        self.cells = [
-            [Cell(board[i][j], i, j) for j in range(width)] for i in range(height)
-        ]
+        self.set_state(BoardState(board))
+
+    def set_state(self, state):
+        """
+        Show a different board state, e.g. one loaded from a saved game.
+
+        Parameters:
+        state - the BoardState to show
+
+        Return: None
+        """
+        self.state = state
+        # Moves that can be undone/redone
+        self.journal = Journal()
+        self.hints = HintEngine(self.state)
+        # Indexes of the cells highlighted by the hint being shown
+        self.hint_cells = ()
+        self.selected_cell = None
+        self.highlighted_cell = None
+        self.dirty.invalidate()
 
     def is_full(self):
         """
@@ -634,9 +767,7 @@ class Board:
         Return:
         True if the board is full, False otherwise
         """
-        if self.find_empty():
-            return False
-        return True
+        return self.state.is_full()
 
     def find_empty(self):
         """
@@ -647,47 +778,21 @@ class Board:
         Tuple of (row, column) of the first empty cell
         False if no empty cells exist
         """
-        for i in range(self.height):
-            for j in range(self.width):
-                if self.cells[i][j].value == 0:
-                    return (i, j)
-        return False
+        index = self.state.values.find(0)
+        if index == -1:
+            return False
+        return divmod(index, self.width)
 
     def is_valid(self):
         """
-        Check if the current board configuration is valid.
+        Check if the current board configuration is valid, i.e. no digit is repeated in
+        any row, column or box. Empty cells are allowed.
 
         Parameters: None
         Return:
         True if the board configuration is valid, False otherwise
         """
-        # Row check
-        for i in range(self.height):
-            s = set()
-            for j in range(self.width):
-                s.add(self.cells[i][j])
-            if len(s) != self.width:
-                return False
-
-        # Col check
-        for i in range(self.width):
-            s = set()
-            for j in range(self.height):
-                s.add(self.cells[j][i])
-            if len(s) != self.width:
-                return False
-
-        # Box check
-        for i in range(0, 3, 3):
-            for j in range(0, 3, 3):
-                s = set()
-                for k in range(3):
-                    for l in range(3):
-                        s.add(self.cells[i + k][j + l])
-                if len(s) != 9:
-                    return False
-
-        return True
+        return self.state.is_valid()
 
     def check_board(self):
         """
@@ -697,33 +802,24 @@ class Board:
         Return:
         True if the board is complete and valid, False otherwise
         """
-        if not self.is_full():
-            return False
-
-        return self.is_valid()
+        return self.state.is_complete()
 
+    def get_conflicts(self):
+        """
+        Get the cells whose number is repeated in their row, column or box.
 
-"""
-DO NOT CHANGE
-Provided for students
-Given a number of rows and number of cells to remove, this function:
-1. creates a SudokuGenerator
-2. fills its values and saves this as the solved state
-3. removes the appropriate number of cells
-4. returns the representative 2D Python Lists of the board and solution
-
-Parameters:
-size is the number of rows/columns of the board (9 for this project)
-removed is the number of cells to clear (set to 0)
-
-Return: list[list] (a 2D Python list to represent the board)
-"""
+        Parameters: None
+        Return:
+        list of (row, column) tuples
+        """
+        return sorted(divmod(index, self.width) for index in self.state.conflicts)
 
+    def get_values(self):
+        """
+        Get the values currently entered in the board.
 
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
-    sudoku.fill_values()
-    board = sudoku.get_board()
-    sudoku.remove_cells()
-    board = sudoku.get_board()
-    return board
+        Parameters: None
+        Return:
+        2D list of ints, 0 for empty cells
+        """
+        return self.state.to_lists()
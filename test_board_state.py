@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from board_state import BoardState, cell_peers
+from generator import generate_puzzle
+
+"""
+    Checks BoardState's running counts against brute-force scans of the board after
+    random edits
+"""
+
+
+def brute_conflicts(state):
+    """
+    Find the cells whose number a peer also holds by comparing every pair of peers.
+    """
+    values = state.values
+    return {
+        index
+        for index, num in enumerate(values)
+        if num and any(values[peer] == num for peer in cell_peers(state.size)[index])
+    }
+
+
+def brute_candidates(state):
+    """
+    Find the numbers no peer holds for every empty cell, as masks.
+    """
+    values = state.values
+    candidates = []
+    for index, num in enumerate(values):
+        if num:
+            candidates.append(0)
+            continue
+        used = {values[peer] for peer in cell_peers(state.size)[index]}
+        candidates.append(
+            sum(1 << n for n in range(1, state.size + 1) if n not in used)
+        )
+    return candidates
+
+
+def check_counts(state):
+    assert state.conflicts == brute_conflicts(state)
+    assert list(state.candidates) == brute_candidates(state)
+    assert state.empty == state.values.count(0)
+    assert state.is_valid() == (not brute_conflicts(state))
+
+
+@pytest.mark.parametrize("size", [4, 9, 16])
+def test_random_edits_match_brute_force(size):
+    rng = random.Random(size)
+    board, solution = generate_puzzle(size, size * size // 2, seed=size)
+    state = BoardState(board)
+    check_counts(state)
+
+    free = [index for index, num in enumerate(state.givens) if not num]
+    for _ in range(300):
+        state.set_value(rng.choice(free), rng.randint(0, size))
+        check_counts(state)
+
+    state.reset()
+    check_counts(state)
+    assert state.values == bytearray(state.givens)
+    assert not state.conflicts
+
+    for index in free:
+        state.set_value(index, solution[index // size][index % size])
+    check_counts(state)
+    assert state.is_complete()
+
+
+def test_copy_is_independent():
+    board, _ = generate_puzzle(9, 40, seed=1)
+    state = BoardState(board)
+    copy = state.copy()
+
+    index = state.values.index(0)
+    state.set_value(index, 1)
+    check_counts(state)
+    check_counts(copy)
+    assert copy.values[index] == 0
+
+
+def test_placing_clears_peer_marks():
+    state = BoardState([[0] * 9 for _ in range(9)])
+    peers = cell_peers(9)[0]
+    for peer in peers[:3]:
+        state.marks[peer] = 1 << 5 | 1 << 7
+
+    cleared = state.set_value(0, 5)
+    assert cleared == 0b111
+    assert all(state.marks[peer] == 1 << 7 for peer in peers[:3])
+
+    state.restore_marks(0, 5, cleared)
+    assert all(state.marks[peer] == 1 << 5 | 1 << 7 for peer in peers[:3])
@@ -0,0 +1,91 @@
+import random
+
+from board_state import BoardState
+from generator import generate_puzzle
+from journal import Journal
+
+"""
+    Checks that moves survive the journal's packing and that undoing and redoing them
+    (the way Board does) restores the board exactly
+"""
+
+
+def snapshot(state):
+    return (
+        bytes(state.values),
+        bytes(state.sketches),
+        bytes(state.invalid),
+        list(state.marks),
+        list(state.candidates),
+        sorted(state.conflicts),
+        state.empty,
+        bytes(state.counts),
+    )
+
+
+def test_moves_round_trip():
+    journal = Journal()
+    # A 25x25 cell has 72 peers, so the cleared mask can need 9 bytes
+    moves = [
+        (0, (0, 0, 0, 0), (5, 5, 0, 0), 0),
+        (80, (0, 3, 0, 1 << 4), (3, 3, 1, 0), 0b101),
+        (624, (0, 0, 0, (1 << 26) - 2), (25, 0, 0, 0), (1 << 72) - 1),
+    ]
+    for move in moves:
+        journal.record(*move)
+    assert len(journal) == 3
+
+    assert [journal.undo() for _ in moves] == moves[::-1]
+    assert journal.undo() is None
+    assert [journal.redo() for _ in moves] == moves
+    assert journal.redo() is None
+
+    # A new move drops the moves that were undone
+    journal.undo()
+    journal.record(*moves[0])
+    assert journal.redo() is None
+
+
+def test_oldest_moves_are_dropped():
+    journal = Journal(max_moves=2)
+    for index in range(3):
+        journal.record(index, (0, 0, 0, 0), (1, 1, 0, 0))
+    assert [journal.undo()[0] for _ in range(2)] == [2, 1]
+    assert journal.undo() is None
+
+
+def test_undo_redo_restores_board():
+    rng = random.Random(3)
+    board, _ = generate_puzzle(9, 45, seed=3)
+    state = BoardState(board)
+    journal = Journal()
+    free = [index for index, num in enumerate(state.givens) if not num]
+
+    states = [snapshot(state)]
+    while len(journal) < 200:
+        index = rng.choice(free)
+        before = state.save_cell(index)
+        cleared = 0
+        if rng.random() < 0.5:
+            num = rng.randint(0, 9)
+            cleared = state.set_value(index, num)
+            state.sketches[index] = num
+        elif not state.values[index]:
+            state.marks[index] ^= 1 << rng.randint(1, 9)
+        after = state.save_cell(index)
+        if after != before:
+            journal.record(index, before, after, cleared)
+            states.append(snapshot(state))
+
+    # Undo and redo the same way Board.undo and Board.redo do
+    for expected in reversed(states[:-1]):
+        index, before, after, cleared = journal.undo()
+        restored = state.restore_cell(index, before)
+        state.restore_marks(index, before[0], restored)
+        state.restore_marks(index, after[0], cleared)
+        assert snapshot(state) == expected
+
+    for expected in states[1:]:
+        index, _, after, _ = journal.redo()
+        state.restore_cell(index, after)
+        assert snapshot(state) == expected
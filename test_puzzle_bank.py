@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from difficulty import DifficultyLevel
+from generator import generate_puzzle
+from puzzle_bank import PuzzleBank, pack_record, record_size, unpack_record, write_bank
+
+"""
+    Checks that puzzles survive packing into records and banks
+"""
+
+
+@pytest.mark.parametrize("size", [4, 9])
+def test_record_round_trip(size):
+    board, solution = generate_puzzle(size, size * size // 2, seed=size)
+    record = pack_record(board, solution)
+
+    assert len(record) == record_size(size)
+    assert unpack_record(record, size) == (board, solution)
+
+
+def test_bank_round_trip(tmp_path):
+    path = str(tmp_path / "puzzles.bank")
+    puzzles = {
+        level: [generate_puzzle(9, 30, seed=k * 10 + i) for i in range(3)]
+        for k, level in enumerate(DifficultyLevel)
+    }
+    puzzles[DifficultyLevel.HARD] = []
+
+    counts = write_bank(path, puzzles)
+    assert counts == {level: len(puzzles[level]) for level in DifficultyLevel}
+
+    with PuzzleBank(path) as bank:
+        assert bank.size == 9
+        assert len(bank) == 6
+        assert bank.count(DifficultyLevel.HARD) == 0
+        for level in (DifficultyLevel.EASY, DifficultyLevel.MEDIUM):
+            for index, puzzle in enumerate(puzzles[level]):
+                assert bank.get(level, index) == puzzle
+        with pytest.raises(IndexError):
+            bank.get(DifficultyLevel.EASY, 3)
+
+
+def test_wrong_size_is_rejected(tmp_path):
+    path = str(tmp_path / "puzzles.bank")
+    puzzles = {DifficultyLevel.EASY: [generate_puzzle(4, 6, seed=1)]}
+
+    with pytest.raises(ValueError):
+        write_bank(path, puzzles, size=9)
+    assert not os.path.exists(path)
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from board_state import BoardState
+from difficulty import DifficultyLevel
+from generator import generate_puzzle
+from savegame import HEADER, SaveWriter, load_game, pack_game, unpack_game
+
+"""
+    Checks that games survive packing and saving, and that corrupt saves are rejected
+"""
+
+
+def played_game(size, seed):
+    """
+    Make a game in progress with numbers, sketches, wrong entries and pencil marks.
+    """
+    rng = random.Random(seed)
+    board, solution = generate_puzzle(size, size * size // 2, seed=seed)
+    state = BoardState(board)
+    free = [index for index, num in enumerate(state.givens) if not num]
+    for index in rng.sample(free, len(free) // 2):
+        choice = rng.random()
+        if choice < 0.4:
+            state.set_value(index, rng.randint(1, size))
+            state.invalid[index] = rng.random() < 0.2
+        elif choice < 0.7:
+            state.sketches[index] = rng.randint(1, size)
+        else:
+            state.marks[index] = rng.getrandbits(size) << 1
+    return state, solution
+
+
+def assert_same_state(state, other):
+    for field in (
+        "size",
+        "givens",
+        "values",
+        "sketches",
+        "invalid",
+        "marks",
+        "empty",
+        "counts",
+        "conflicts",
+        "candidates",
+        "given_counts",
+    ):
+        assert getattr(other, field) == getattr(state, field), field
+
+
+@pytest.mark.parametrize("size", [4, 9, 16, 25])
+def test_pack_round_trip(size):
+    state, solution = played_game(size, size)
+    saved = unpack_game(pack_game(state, solution, 2, DifficultyLevel.HARD))
+
+    assert_same_state(state, saved.state)
+    assert saved.solution == solution
+    assert saved.mistakes == 2
+    assert saved.difficulty is DifficultyLevel.HARD
+
+
+def corrupt(data, offset, value):
+    data = bytearray(data)
+    data[offset] = value
+    return bytes(data)
+
+
+def test_corrupt_saves_are_rejected():
+    state, solution = played_game(9, 1)
+    data = pack_game(state, solution, 1, DifficultyLevel.EASY)
+    area = 81
+    given = next(index for index, num in enumerate(state.givens) if num)
+
+    bad = [
+        data[:-1],
+        b"SDKX" + data[4:],
+        corrupt(data, 5, 8),  # board size that isn't a square
+        corrupt(data, 7, 99),  # unknown difficulty
+        corrupt(data, HEADER.size + given, 10),  # given above the size
+        corrupt(data, HEADER.size + area, 10),  # value above the size
+        corrupt(data, HEADER.size + 3 * area, 2),  # invalid flag that isn't 0/1
+        corrupt(data, HEADER.size + 4 * area, 0),  # incomplete solution
+        corrupt(data, HEADER.size + 5 * area + 1, 2),  # pencil mark beyond 9
+    ]
+    for data in bad:
+        with pytest.raises(ValueError):
+            unpack_game(data)
+
+
+def test_writer_keeps_the_newest_save(tmp_path):
+    path = str(tmp_path / "savegame.bin")
+    state, solution = played_game(9, 2)
+    writer = SaveWriter()
+
+    for mistakes in range(3):
+        writer.save(path, state, solution, mistakes, DifficultyLevel.MEDIUM)
+    writer.flush()
+    saved = load_game(path)
+    assert_same_state(state, saved.state)
+    assert saved.mistakes == 2
+
+    writer.save(path, state, solution, 0, DifficultyLevel.MEDIUM)
+    writer.delete(path)
+    writer.flush()
+    assert load_game(path) is None
+    assert not (tmp_path / "savegame.bin.tmp").exists()
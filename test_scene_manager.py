@@ -0,0 +1,122 @@
+import importlib
+import os
+import sys
+import tracemalloc
+
+import pygame
+import pytest
+
+"""
+    Runs the game's real scenes (menu_loop, game_loop and their Boards) through
+    SceneManager on SDL's dummy video driver, clicking through many menu -> game ->
+    restart round trips with injected events, to check restarts neither nest scenes on
+    the stack nor leak memory
+
+    Run with: python -m pytest test_scene_manager.py
+"""
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+WARM_UP_ROUNDS = 10
+ROUNDS = 100
+# Memory that may still be held after ROUNDS more round trips than after the warm-up.
+# Leaking a Board per round trip would hold about 600 KiB more.
+MAX_GROWTH = 256 * 1024
+
+
+@pytest.fixture
+def sudoku(monkeypatch, tmp_path):
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+    # The assets are loaded relative to the working directory at import time
+    monkeypatch.chdir(REPO)
+    module = importlib.import_module("sudoku")
+
+    monkeypatch.setattr(module, "SAVE_PATH", str(tmp_path / "savegame.bin"))
+    # The dummy driver has no system cursors for the buttons' hover effect
+    monkeypatch.setattr(pygame.mouse, "set_cursor", lambda *args: None)
+    # No frame rate cap, so the test doesn't sleep between frames
+    monkeypatch.setattr(module.scheduler, "fps", 0)
+
+    # The same puzzle every game, so the rounds don't wait on the generator
+    from difficulty import DifficultyLevel
+    from generator import generate_puzzle
+
+    board, solution = generate_puzzle(
+        module.BOARD_SIZE, band=DifficultyLevel.EASY, seed=1
+    )
+    monkeypatch.setattr(
+        module,
+        "new_puzzle",
+        lambda difficulty: ([row[:] for row in board], [row[:] for row in solution]),
+    )
+    return module
+
+
+def click(button):
+    """
+    Queue the events of moving the mouse onto a button and clicking it.
+    """
+    pos = button.rect.center
+    pygame.event.post(
+        pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))
+    )
+    pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))
+
+
+def test_restarts_keep_stack_and_memory_flat(sudoku, monkeypatch):
+    scene_codes = {
+        scene.__code__
+        for scene in (sudoku.menu_loop, sudoku.game_loop, sudoku.status_loop)
+    }
+    depths = []
+
+    # Every scene waits for input through the scheduler, so count the scenes on the
+    # stack each time one does
+    events = sudoku.scheduler.events
+
+    def counted_events(*args, **kwargs):
+        frame = sys._getframe(1)
+        depth = 0
+        while frame is not None:
+            depth += frame.f_code in scene_codes
+            frame = frame.f_back
+        depths.append(depth)
+        return events(*args, **kwargs)
+
+    monkeypatch.setattr(sudoku.scheduler, "events", counted_events)
+
+    remaining = [0]
+
+    def menu():
+        # Start a game, or quit once the round trips are done
+        if remaining[0] > 0:
+            click(sudoku.easy_button)
+        else:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+        return sudoku.menu_loop()
+
+    def game(**kwargs):
+        remaining[0] -= 1
+        click(sudoku.restart_button)
+        return sudoku.game_loop(**kwargs)
+
+    manager = sudoku.SceneManager({"menu": menu, "game": game})
+
+    pygame.event.clear()
+    tracemalloc.start()
+    try:
+        remaining[0] = WARM_UP_ROUNDS
+        assert manager.run("menu") == 2 * WARM_UP_ROUNDS + 1
+        warm, _ = tracemalloc.get_traced_memory()
+
+        remaining[0] = ROUNDS
+        assert manager.run("menu") == 2 * ROUNDS + 1
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert depths and max(depths) == 1
+    assert held - warm < MAX_GROWTH
+    # Restarting abandons the game, so nothing is left to resume
+    sudoku.saver.flush()
+    assert not os.path.exists(sudoku.SAVE_PATH)
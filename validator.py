@@ -0,0 +1,138 @@
+from math import isqrt
+
+import numpy as np
+
+"""
+    Vectorized rule checking for whole stacks of sudoku grids
+
+    Units are numbered rows first, then columns, then boxes: on a 9x9 grid units 0-8 are
+    the rows, 9-17 the columns and 18-26 the boxes (left to right, top to bottom).
+"""
+
+# Lookup table from line characters to cell values, 255 marks an invalid character
+CHAR_TABLE = np.full(256, 255, dtype=np.uint8)
+CHAR_TABLE[ord(".")] = 0
+CHAR_TABLE[ord("0") : ord("9") + 1] = np.arange(10)
+
+
+def validate_grids(grids, complete=False, chunk_size=16384):
+    """
+    Check the rows, columns and boxes of many grids at once.
+
+    Parameters:
+    grids - array-like of shape (N, size, size), or a single (size, size) grid; 0 marks
+            an empty cell
+    complete - if True a grid is only valid when every cell is filled in, otherwise empty
+               cells are allowed and only repeated or out of range digits are errors
+    chunk_size - the number of grids checked per vectorized step, bounding memory use
+
+    Return:
+    tuple of (valid, first_unit): a bool array with one entry per grid, and an int array
+    holding the first offending unit of each grid, or -1 for valid grids
+    """
+    grids = np.asarray(grids)
+    if grids.ndim == 2:
+        grids = grids[np.newaxis]
+
+    count, size, _ = grids.shape
+    valid = np.empty(count, dtype=bool)
+    first_unit = np.empty(count, dtype=np.int64)
+
+    for start in range(0, count, chunk_size):
+        stop = min(start + chunk_size, count)
+        bad = unit_errors(grids[start:stop], complete)
+        valid[start:stop] = ~bad.any(axis=1)
+        first_unit[start:stop] = np.where(valid[start:stop], -1, bad.argmax(axis=1))
+
+    return valid, first_unit
+
+
+def unit_errors(grids, complete=False):
+    """
+    Find the units that break a rule in each grid.
+
+    Parameters:
+    grids - array of shape (N, size, size)
+    complete - whether a missing digit counts as an error
+
+    Return:
+    bool array of shape (N, 3 * size), True for every offending unit
+    """
+    count, size, _ = grids.shape
+    box_length = isqrt(size)
+
+    # digits[n, row, col, d] is True when the cell holds digit d + 1
+    digits = grids[..., np.newaxis] == np.arange(1, size + 1, dtype=grids.dtype)
+
+    rows = digits.sum(axis=2, dtype=np.uint8)
+    cols = digits.sum(axis=1, dtype=np.uint8)
+    boxes = (
+        digits.reshape(count, box_length, box_length, box_length, box_length, size)
+        .sum(axis=(2, 4), dtype=np.uint8)
+        .reshape(count, size, size)
+    )
+    counts = np.concatenate((rows, cols, boxes), axis=1)
+
+    errors = (counts > 1).any(axis=2)
+    if complete:
+        errors |= (counts == 0).any(axis=2)
+
+    # A digit outside 0-size is never counted above, so flag its row directly
+    out_of_range = ((grids < 0) | (grids > size)).any(axis=2)
+    errors[:, :size] |= out_of_range
+
+    return errors
+
+
+def unit_name(unit, size=9):
+    """
+    Describe a unit number returned by validate_grids.
+
+    Parameters:
+    unit - the unit number
+    size - the number of rows/columns of the grid
+
+    Return:
+    str such as "row 1", "column 4" or "box 9" (counting from 1)
+    """
+    kind, index = divmod(unit, size)
+    return f"{('row', 'column', 'box')[kind]} {index + 1}"
+
+
+def lines_to_grids(lines, size=9):
+    """
+    Parse one-line boards ('.' or '0' for empty cells) into a stacked array without a
+    per-cell Python loop.
+
+    Parameters:
+    lines - list of strs holding size * size characters each (trailing whitespace is
+            ignored)
+    size - the number of rows/columns of every board
+
+    Return:
+    uint8 array of shape (N, size, size)
+
+    Raises:
+    ValueError naming the index of the first line with the wrong length or a character
+    that isn't a digit or '.'
+    """
+    area = size * size
+    lines = [line.rstrip() for line in lines]
+
+    # Checked line by line, as a short line followed by a long one adds up to the
+    # right total length
+    lengths = np.fromiter(map(len, lines), dtype=np.intp, count=len(lines))
+    wrong = np.flatnonzero(lengths != area)
+    if len(wrong):
+        index = wrong[0]
+        raise ValueError(
+            f"line {index} has {lengths[index]} characters instead of {area}"
+        )
+
+    text = "".join(lines).encode("ascii", "replace")
+    grids = CHAR_TABLE[np.frombuffer(text, dtype=np.uint8)]
+    bad = np.flatnonzero(grids == 255)
+    if len(bad):
+        raise ValueError(f"line {bad[0] // area} may only contain digits and '.'")
+
+    return grids.reshape(len(lines), size, size)